@@ -1,73 +1,277 @@
 import logging
 import asyncio
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Optional, List, Dict, Any
-from motor.motor_asyncio import (
-    AsyncIOMotorClient,
-    AsyncIOMotorDatabase,
-    AsyncIOMotorCollection,
-)
-import pymongo
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
+from pymongo import AsyncMongoClient, IndexModel, ReturnDocument, UpdateOne
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.errors import OperationFailure
+from pymongo.write_concern import WriteConcern
 from bson import ObjectId
 
 from app.config import settings
-from app.analytics_models import StreamSession, StreamSnapshot, StreamerStats
-from app.storage import get_storage
+from app.analytics_models import StreamerStats
+from app.storage import StorageInterface, get_storage
 
 logger = logging.getLogger(__name__)
 
+# Snapshots are queued and written in batches: the flusher waits at most
+# SNAPSHOT_FLUSH_INTERVAL seconds for up to SNAPSHOT_BATCH_SIZE documents
+SNAPSHOT_BATCH_SIZE = 500
+SNAPSHOT_FLUSH_INTERVAL = 0.25
+# Cap on queued snapshots so a MongoDB outage cannot grow memory without bound
+SNAPSHOT_QUEUE_MAX = SNAPSHOT_BATCH_SIZE * 20
+
+# Snapshots that carry a viewer count; used both as the partial index filter
+# and in queries, which must include it for the planner to pick that index
+LIVE_VIEWER_FILTER = {"is_live": True, "viewer_count": {"$type": "number"}}
+
+# Server error code for create_index on an existing key with different options
+INDEX_OPTIONS_CONFLICT = 85
+
+# Upper bound on concurrent per-streamer stats recomputes, kept well inside
+# the MongoDB connection pool
+STATS_RECOMPUTE_CONCURRENCY = 8
+# Streamer stats are recomputed at most once per broadcaster per window
+STATS_DEBOUNCE_SECONDS = 5
+
+# Seconds that streamer stats reads are served from the in-process cache
+STATS_CACHE_TTL = 30
+# Seconds the collection-wide summary is reused for repeated dashboard polls
+SUMMARY_CACHE_TTL = 15
+
+# Sessions that have not ended yet; matches the partial active-session index
+ACTIVE_SESSION_FILTER = {"ended_at": None}
+
+# Upper bound on points returned for a single session's viewer series
+MAX_VIEWER_SAMPLE_POINTS = 500
+
+# Points kept on a session document when it ends, so its viewer curve outlives
+# the raw snapshots
+SESSION_SERIES_BUCKETS = 60
+
+# Read projections. List endpoints name their fields and stringify _id on the
+# server, so documents come back ready to serialize; internal bookkeeping, the
+# stored viewer series and the deprecated tag_ids are left out
+SESSION_PROJECTION = {
+    "_id": {"$toString": "$_id"},
+    "broadcaster_id": 1,
+    "broadcaster_login": 1,
+    "broadcaster_name": 1,
+    "started_at": 1,
+    "ended_at": 1,
+    "duration_minutes": 1,
+    "category_id": 1,
+    "category_name": 1,
+    "title": 1,
+    "max_viewers": 1,
+    "avg_viewers": 1,
+    "created_at": 1,
+    "updated_at": 1,
+}
+SNAPSHOT_PROJECTION = {
+    "_id": {"$toString": "$_id"},
+    "broadcaster_id": 1,
+    "broadcaster_login": 1,
+    "broadcaster_name": 1,
+    "is_live": 1,
+    "stream_id": 1,
+    "category_id": 1,
+    "category_name": 1,
+    "title": 1,
+    "viewer_count": 1,
+    "started_at": 1,
+    "language": 1,
+    "thumbnail_url": 1,
+    "captured_at": 1,
+}
+STATS_PROJECTION = {
+    "total_minutes": 0,
+    "viewer_sample_sum": 0,
+    "viewer_sample_count": 0,
+    "recomputed_at": 0,
+}
+TOP_STREAMER_PROJECTION = {
+    "_id": {"$toString": "$_id"},
+    "broadcaster_id": 1,
+    "broadcaster_login": 1,
+    "broadcaster_name": 1,
+    "total_streams": 1,
+    "total_hours_streamed": 1,
+    "avg_stream_duration_minutes": 1,
+    "max_concurrent_viewers": 1,
+    "avg_viewers_all_time": 1,
+    "last_stream_at": 1,
+}
+
+
+@lru_cache(maxsize=1024)
+def parse_twitch_timestamp(value: str) -> datetime:
+    """Parse a Twitch RFC 3339 timestamp such as 2024-01-01T12:00:00Z"""
+    # Python 3.11+ fromisoformat accepts the trailing Z directly. A live
+    # stream's started_at repeats on every poll, so parsed values are cached
+    return datetime.fromisoformat(value)
+
+
+def _session_doc(event_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a stream_sessions document from a stream.online event"""
+    now = datetime.now(timezone.utc)
+    return {
+        "broadcaster_id": event_data["broadcaster_user_id"],
+        "broadcaster_login": event_data["broadcaster_user_login"],
+        "broadcaster_name": event_data["broadcaster_user_name"],
+        "started_at": parse_twitch_timestamp(event_data["started_at"]),
+        "ended_at": None,
+        # Running viewer totals, bumped by the snapshot flusher while live
+        "max_viewers": None,
+        "viewer_sample_sum": 0,
+        "viewer_sample_count": 0,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def _snapshot_doc(stream_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a stream_snapshots document from Helix stream data"""
+    started_at = stream_data.get("started_at")
+    return {
+        "broadcaster_id": stream_data.get("user_id"),
+        "broadcaster_login": stream_data.get("user_login"),
+        "broadcaster_name": stream_data.get("user_name"),
+        "is_live": bool(stream_data.get("id")),  # Has stream ID if live
+        "stream_id": stream_data.get("id"),
+        "category_id": stream_data.get("game_id"),
+        "category_name": stream_data.get("game_name"),
+        "title": stream_data.get("title"),
+        "viewer_count": stream_data.get("viewer_count"),
+        "started_at": parse_twitch_timestamp(started_at) if started_at else None,
+        "language": stream_data.get("language"),
+        "thumbnail_url": stream_data.get("thumbnail_url"),
+        "captured_at": datetime.now(timezone.utc),
+    }
+
+
+def _session_viewer_updates(snapshots: List[Dict[str, Any]]) -> List[UpdateOne]:
+    """Fold a batch of snapshots into per-session running viewer totals"""
+    totals: Dict[str, Dict[str, int]] = {}
+    for snapshot in snapshots:
+        viewer_count = snapshot.get("viewer_count")
+        if not snapshot.get("is_live") or viewer_count is None:
+            continue
+        entry = totals.setdefault(
+            snapshot["broadcaster_id"], {"max": viewer_count, "sum": 0, "count": 0}
+        )
+        entry["max"] = max(entry["max"], viewer_count)
+        entry["sum"] += viewer_count
+        entry["count"] += 1
+
+    return [
+        UpdateOne(
+            {"broadcaster_id": broadcaster_id, **ACTIVE_SESSION_FILTER},
+            {
+                "$max": {"max_viewers": entry["max"]},
+                "$inc": {
+                    "viewer_sample_sum": entry["sum"],
+                    "viewer_sample_count": entry["count"],
+                },
+            },
+        )
+        for broadcaster_id, entry in totals.items()
+    ]
+
+
+def _viewer_stats_from_totals(session: Dict[str, Any]) -> Dict[str, Any]:
+    """Derive session viewer stats from its running totals"""
+    sample_count = session.get("viewer_sample_count") or 0
+    if not sample_count:
+        return {"max_viewers": None, "avg_viewers": None}
+
+    sample_sum = session.get("viewer_sample_sum") or 0
+    return {
+        "max_viewers": session.get("max_viewers"),
+        "avg_viewers": round(sample_sum / sample_count, 2),
+        "viewer_sample_sum": sample_sum,
+        "viewer_sample_count": sample_count,
+    }
+
+
+def _session_stats_group(group_id: Any) -> Dict[str, Any]:
+    """$group stage reducing stream sessions to streamer stats totals"""
+    return {
+        "$group": {
+            "_id": group_id,
+            "total_streams": {"$sum": {"$cond": [{"$ne": ["$ended_at", None]}, 1, 0]}},
+            "total_minutes": {"$sum": {"$ifNull": ["$duration_minutes", 0]}},
+            "avg_duration": {"$avg": {"$ifNull": ["$duration_minutes", None]}},
+            "last_stream": {"$max": "$started_at"},
+            "first_stream": {"$min": "$started_at"},
+            "broadcaster_login": {"$first": "$broadcaster_login"},
+            "broadcaster_name": {"$first": "$broadcaster_name"},
+            "max_viewers": {"$max": "$max_viewers"},
+            "viewer_sum": {"$sum": {"$ifNull": ["$viewer_sample_sum", 0]}},
+            "sample_count": {"$sum": {"$ifNull": ["$viewer_sample_count", 0]}},
+        }
+    }
+
 
 class AnalyticsService:
     def __init__(self):
-        self.client: Optional[AsyncIOMotorClient] = None
-        self.db: Optional[AsyncIOMotorDatabase] = None
-        self.sessions: Optional[AsyncIOMotorCollection] = None
-        self.snapshots: Optional[AsyncIOMotorCollection] = None
-        self.stats: Optional[AsyncIOMotorCollection] = None
+        self.client: Optional[AsyncMongoClient] = None
+        self.db: Optional[AsyncDatabase] = None
+        self.sessions: Optional[AsyncCollection] = None
+        self.snapshots: Optional[AsyncCollection] = None
+        self.stats: Optional[AsyncCollection] = None
+        self._snapshot_queue: asyncio.Queue = asyncio.Queue(SNAPSHOT_QUEUE_MAX)
+        self._flusher_task: Optional[asyncio.Task] = None
+        self._dirty_broadcasters: set[str] = set()
+        self._stats_task: Optional[asyncio.Task] = None
+        self._indexes_ready = False
+        # Shared stream storage; its connection is owned by the app lifespan
+        self.storage: StorageInterface = get_storage()
+        # Read caches keyed by broadcaster_login / limit: (cached_at, value)
+        self._stats_cache: Dict[str, tuple[float, Dict[str, Any]]] = {}
+        self._top_streamers_cache: Dict[int, tuple[float, List[Dict[str, Any]]]] = {}
+        self._summary_cache: Optional[tuple[float, Dict[str, Any]]] = None
 
     async def connect(self, max_retries: int = 5, retry_delay: int = 2):
         """Initialize MongoDB connection with retry logic"""
+        # Log connection details (without exposing password)
+        safe_url = (
+            settings.MONGODB_URL.replace(
+                settings.MONGODB_URL.split("@")[0].split("//")[1], "***:***"
+            )
+            if "@" in settings.MONGODB_URL
+            else settings.MONGODB_URL
+        )
+        logger.info(f"MongoDB URL: {safe_url}")
+        logger.info(f"MongoDB Database: {settings.MONGODB_DATABASE}")
+
+        # The client connects lazily and reconnects on its own, so it is built
+        # once and only the handshake below is retried
+        self.client = AsyncMongoClient(
+            settings.MONGODB_URL,
+            serverSelectionTimeoutMS=5000,  # 5 second timeout
+            # BSON dates are always UTC; decode them as aware datetimes so
+            # they compare directly with datetime.now(timezone.utc)
+            tz_aware=True,
+            maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+            minPoolSize=4,
+            maxIdleTimeMS=60000,
+            compressors="zlib",
+        )
+        self.db = self.client[settings.MONGODB_DATABASE]
+
         for attempt in range(max_retries):
             try:
                 logger.info(
                     f"Attempting MongoDB connection (attempt {attempt + 1}/{max_retries})"
                 )
-                # Log connection details (without exposing password)
-                safe_url = (
-                    settings.MONGODB_URL.replace(
-                        settings.MONGODB_URL.split("@")[0].split("//")[1], "***:***"
-                    )
-                    if "@" in settings.MONGODB_URL
-                    else settings.MONGODB_URL
-                )
-                logger.info(f"MongoDB URL: {safe_url}")
-                logger.info(f"MongoDB Database: {settings.MONGODB_DATABASE}")
-
-                self.client = AsyncIOMotorClient(
-                    settings.MONGODB_URL,
-                    serverSelectionTimeoutMS=5000,  # 5 second timeout
-                )
-                self.db = self.client[settings.MONGODB_DATABASE]
-
-                # Test the connection
-                await self.client.admin.command("ping")
-                logger.info("MongoDB ping successful")
-
-                # Test database access
-                await self.db.list_collection_names()
-                logger.info(
-                    f"Successfully accessed database: {settings.MONGODB_DATABASE}"
-                )
-
-                self.sessions = self.db["stream_sessions"]
-                self.snapshots = self.db["stream_snapshots"]
-                self.stats = self.db["streamer_stats"]
-
-                # Create indexes for better performance
-                await self._create_indexes()
-
-                logger.info("MongoDB analytics service connected successfully")
-                return
+                # Test the connection; hello also primes the driver's topology view
+                await self.client.admin.command("hello")
+                logger.info("MongoDB hello successful")
+                break
 
             except Exception as e:
                 logger.error(
@@ -77,15 +281,51 @@ class AnalyticsService:
                     logger.error(
                         f"Failed to connect to MongoDB after {max_retries} attempts"
                     )
+                    await self.client.close()
+                    self.client = None
+                    self.db = None
                     raise
                 else:
                     logger.info(f"Retrying in {retry_delay} seconds...")
                     await asyncio.sleep(retry_delay)
 
+        self.sessions = self.db["stream_sessions"]
+        # Acknowledged handle so index/DDL errors surface; only the snapshot
+        # inserts in _write_snapshot_batch skip acknowledgements
+        self.snapshots = self.db["stream_snapshots"]
+        self.stats = self.db["streamer_stats"]
+
+        # Create indexes for better performance
+        await self._create_indexes()
+
+        # Start background snapshot writer
+        self._flusher_task = asyncio.create_task(self._flush_snapshots())
+
+        # Start debounced streamer stats updater
+        self._stats_task = asyncio.create_task(self._flush_dirty_stats())
+
+        logger.info("MongoDB analytics service connected successfully")
+
     async def disconnect(self):
-        """Close MongoDB connection"""
+        """Flush pending snapshots and close MongoDB connection"""
+        if self._flusher_task and not self._flusher_task.done():
+            # Sentinel tells the flusher to write what it has and exit
+            await self._snapshot_queue.put(None)
+            await self._flusher_task
+            self._flusher_task = None
+
+        if self._stats_task and not self._stats_task.done():
+            self._stats_task.cancel()
+            try:
+                await self._stats_task
+            except asyncio.CancelledError:
+                pass
+            self._stats_task = None
+            # Don't drop updates for streams that ended inside the last window
+            await self._update_dirty_stats()
+
         if self.client:
-            self.client.close()
+            await self.client.close()
 
     async def health_check(self) -> bool:
         """Check if MongoDB connection is healthy"""
@@ -100,138 +340,314 @@ class AnalyticsService:
 
     async def _create_indexes(self):
         """Create necessary indexes for collections"""
-        try:
-            # StreamSession indexes
-            await self.sessions.create_index("broadcaster_id")
-            await self.sessions.create_index("started_at")
-            await self.sessions.create_index(
-                [("broadcaster_id", 1), ("started_at", -1)]
-            )
+        if self._indexes_ready:
+            return
 
-            # StreamSnapshot indexes
-            await self.snapshots.create_index("broadcaster_id")
+        # Single-field broadcaster_id indexes are left out: the compound indexes
+        # below lead with it and serve the same lookups
+        session_indexes = [
+            IndexModel("started_at"),
+            IndexModel([("broadcaster_id", 1), ("started_at", -1)]),
+            # Session history is looked up by login, newest first
+            IndexModel([("broadcaster_login", 1), ("started_at", -1)]),
+            # Only open sessions, so finding a broadcaster's active session stays cheap
+            IndexModel(
+                [("broadcaster_id", 1), ("started_at", -1)],
+                name="active_sessions_by_broadcaster",
+                partialFilterExpression=ACTIVE_SESSION_FILTER,
+            ),
+            # Serves active-session counts and scans and the stale-session sweep
+            IndexModel(
+                [("ended_at", 1), ("started_at", 1)],
+                partialFilterExpression=ACTIVE_SESSION_FILTER,
+            ),
+        ]
+        snapshot_indexes = [
+            IndexModel([("broadcaster_id", 1), ("captured_at", -1)]),
+            # Recent snapshots are filtered by login, newest first
+            IndexModel([("broadcaster_login", 1), ("captured_at", -1)]),
+            IndexModel(
+                [("broadcaster_id", 1), ("captured_at", 1), ("viewer_count", 1)],
+                partialFilterExpression=LIVE_VIEWER_FILTER,
+            ),
+        ]
+        stats_indexes = [
+            IndexModel("broadcaster_id", unique=True),
+            IndexModel("broadcaster_login"),
+            IndexModel([("total_hours_streamed", -1)]),
+        ]
+
+        # One createIndexes command per collection, all sent concurrently; the
+        # TTL index is separate because it may need converting with collMod
+        results = await asyncio.gather(
+            self.sessions.create_indexes(session_indexes),
+            self.snapshots.create_indexes(snapshot_indexes),
+            self.stats.create_indexes(stats_indexes),
+            self._ensure_snapshot_ttl_index(),
+            return_exceptions=True,
+        )
+        failures = [result for result in results if isinstance(result, Exception)]
+        for failure in failures:
+            logger.warning(f"Failed to create indexes: {failure}")
+        # Retry on the next connect if anything failed
+        self._indexes_ready = not failures
+
+    async def _ensure_snapshot_ttl_index(self):
+        """Index captured_at with a TTL so old snapshots expire server-side"""
+        if settings.SNAPSHOT_RETENTION_DAYS <= 0:
             await self.snapshots.create_index("captured_at")
+            return
+
+        ttl_seconds = settings.SNAPSHOT_RETENTION_DAYS * 24 * 3600
+        try:
             await self.snapshots.create_index(
-                [("broadcaster_id", 1), ("captured_at", -1)]
+                "captured_at", expireAfterSeconds=ttl_seconds
+            )
+        except OperationFailure as e:
+            if e.code != INDEX_OPTIONS_CONFLICT:
+                raise
+            # An existing captured_at index (plain or with another TTL) is
+            # converted in place instead of being dropped and rebuilt
+            await self.db.command(
+                "collMod",
+                self.snapshots.name,
+                index={
+                    "keyPattern": {"captured_at": 1},
+                    "expireAfterSeconds": ttl_seconds,
+                },
             )
-
-            # StreamerStats indexes
-            await self.stats.create_index("broadcaster_id", unique=True)
-            await self.stats.create_index("broadcaster_login")
-
-        except Exception as e:
-            logger.warning(f"Failed to create some indexes: {e}")
 
     async def start_stream_session(self, event_data: Dict[str, Any]) -> str:
         """Start a new stream session when stream goes online"""
-        session = StreamSession(
-            broadcaster_id=event_data["broadcaster_user_id"],
-            broadcaster_login=event_data["broadcaster_user_login"],
-            broadcaster_name=event_data["broadcaster_user_name"],
-            started_at=datetime.fromisoformat(
-                event_data["started_at"].replace("Z", "+00:00")
-            ),
+        session_doc = _session_doc(event_data)
+        broadcaster_id = session_doc["broadcaster_id"]
+
+        # Keep at most one open session per broadcaster so the snapshot
+        # flusher's running totals always land on the new session
+        superseded = await self._supersede_open_sessions(
+            broadcaster_id, session_doc["started_at"]
         )
+        result = await self.sessions.insert_one(session_doc)
+        if superseded:
+            logger.warning(
+                f"Closed {superseded} open session(s) for "
+                f"{event_data['broadcaster_user_login']} left by a missed offline event"
+            )
+            # Superseded sessions were never folded into the stats incrementally
+            self._dirty_broadcasters.add(broadcaster_id)
 
-        result = await self.sessions.insert_one(
-            session.dict(by_alias=True, exclude_unset=True)
+        logger.info(
+            f"Started stream session for {event_data['broadcaster_user_login']}"
         )
-        logger.info(f"Started stream session for {session.broadcaster_login}")
         return str(result.inserted_id)
 
+    async def _supersede_open_sessions(
+        self, broadcaster_id: str, ended_at: datetime
+    ) -> int:
+        """Close a broadcaster's open sessions at the start of a newer one"""
+        result = await self.sessions.update_many(
+            {"broadcaster_id": broadcaster_id, **ACTIVE_SESSION_FILTER},
+            [
+                {
+                    "$set": {
+                        "ended_at": ended_at,
+                        "updated_at": datetime.now(timezone.utc),
+                        "superseded": True,
+                        "duration_minutes": {
+                            "$max": [
+                                0,
+                                {
+                                    "$toInt": {
+                                        "$divide": [
+                                            {"$subtract": [ended_at, "$started_at"]},
+                                            60000,
+                                        ]
+                                    }
+                                },
+                            ]
+                        },
+                        # Viewer stats come from the running totals collected so far
+                        "avg_viewers": {
+                            "$cond": [
+                                {"$gt": ["$viewer_sample_count", 0]},
+                                {
+                                    "$round": [
+                                        {
+                                            "$divide": [
+                                                "$viewer_sample_sum",
+                                                "$viewer_sample_count",
+                                            ]
+                                        },
+                                        2,
+                                    ]
+                                },
+                                None,
+                            ]
+                        },
+                    }
+                }
+            ],
+        )
+        return result.modified_count
+
     async def end_stream_session(self, broadcaster_id: str, ended_at: datetime = None):
         """End the current stream session when stream goes offline"""
         if ended_at is None:
             ended_at = datetime.now(timezone.utc)
 
-        # Find the most recent active session
-        session = await self.sessions.find_one(
-            {"broadcaster_id": broadcaster_id, "ended_at": None},
+        # Close the most recent active session atomically, getting its pre-image;
+        # the duration is computed server-side from the stored started_at
+        session = await self.sessions.find_one_and_update(
+            {"broadcaster_id": broadcaster_id, **ACTIVE_SESSION_FILTER},
+            [
+                {
+                    "$set": {
+                        "ended_at": ended_at,
+                        "updated_at": datetime.now(timezone.utc),
+                        "duration_minutes": {
+                            "$toInt": {
+                                "$divide": [
+                                    {"$subtract": [ended_at, "$started_at"]},
+                                    60000,
+                                ]
+                            }
+                        },
+                    }
+                }
+            ],
+            projection={
+                "broadcaster_id": 1,
+                "broadcaster_login": 1,
+                "broadcaster_name": 1,
+                "started_at": 1,
+                "max_viewers": 1,
+                "viewer_sample_sum": 1,
+                "viewer_sample_count": 1,
+            },
             sort=[("started_at", -1)],
+            return_document=ReturnDocument.BEFORE,
         )
 
         if not session:
             logger.warning(f"No active session found for broadcaster {broadcaster_id}")
             return
 
-        # Calculate duration - handle timezone differences
         started_at = session["started_at"]
-        if started_at.tzinfo is None and ended_at.tzinfo is not None:
-            # Make both naive or both aware
-            ended_at = ended_at.replace(tzinfo=None)
-        elif started_at.tzinfo is not None and ended_at.tzinfo is None:
-            started_at = started_at.replace(tzinfo=None)
 
+        # Mirrors the server-side duration for the stats fold below
         duration_minutes = int((ended_at - started_at).total_seconds() / 60)
 
-        # Calculate viewer stats from snapshots
-        viewer_stats = await self._calculate_viewer_stats(str(session["_id"]), ended_at)
+        viewer_series_query = self._bucket_viewer_samples(
+            broadcaster_id, started_at, ended_at, SESSION_SERIES_BUCKETS
+        )
+
+        # Sessions carry running viewer totals; older ones fall back to snapshots
+        if "viewer_sample_count" in session:
+            viewer_stats = _viewer_stats_from_totals(session)
+            viewer_series = await viewer_series_query
+        else:
+            viewer_stats, viewer_series = await asyncio.gather(
+                self._calculate_viewer_stats(str(session["_id"]), ended_at),
+                viewer_series_query,
+            )
 
-        # Update session
+        # Fill in the viewer fields on the now-closed session
         update_data = {
-            "ended_at": ended_at,
-            "duration_minutes": duration_minutes,
-            "updated_at": datetime.now(timezone.utc),
+            "viewer_count_samples": viewer_series,
             **viewer_stats,
         }
 
-        await self.sessions.update_one({"_id": session["_id"]}, {"$set": update_data})
-
-        # Update streamer stats
-        await self._update_streamer_stats(broadcaster_id)
+        # The session update and the stats fold touch different collections
+        _, applied = await asyncio.gather(
+            self.sessions.update_one({"_id": session["_id"]}, {"$set": update_data}),
+            self._apply_session_to_stats(
+                session, started_at, duration_minutes, viewer_stats
+            ),
+        )
+        if not applied:
+            # A full recompute reads this session, so it is queued after the
+            # update; bursts of ends for one streamer share a single recompute
+            self._dirty_broadcasters.add(broadcaster_id)
 
         logger.info(
             f"Ended stream session for {session['broadcaster_login']} (duration: {duration_minutes}m)"
         )
 
     async def capture_stream_snapshot(self, stream_data: Dict[str, Any]):
-        """Capture a snapshot of current stream data"""
-        snapshot = StreamSnapshot(
-            broadcaster_id=stream_data.get("user_id"),
-            broadcaster_login=stream_data.get("user_login"),
-            broadcaster_name=stream_data.get("user_name"),
-            is_live=bool(stream_data.get("id")),  # Has stream ID if live
-            stream_id=stream_data.get("id"),
-            category_id=stream_data.get("game_id"),
-            category_name=stream_data.get("game_name"),
-            title=stream_data.get("title"),
-            viewer_count=stream_data.get("viewer_count"),
-            started_at=datetime.fromisoformat(
-                stream_data["started_at"].replace("Z", "+00:00")
-            )
-            if stream_data.get("started_at")
-            else None,
-            language=stream_data.get("language"),
-            thumbnail_url=stream_data.get("thumbnail_url"),
-            tag_ids=stream_data.get("tag_ids", []),
-        )
+        """Queue a snapshot of current stream data for the batch writer"""
+        if self.snapshots is None:
+            raise RuntimeError("Analytics service not connected to MongoDB")
 
-        await self.snapshots.insert_one(
-            snapshot.dict(by_alias=True, exclude_unset=True)
+        try:
+            self._snapshot_queue.put_nowait(_snapshot_doc(stream_data))
+        except asyncio.QueueFull:
+            login = stream_data.get("user_login")
+            logger.warning(f"Snapshot queue full, dropping snapshot for {login}")
+
+    async def _flush_snapshots(self):
+        """Background task that drains queued snapshots with insert_many"""
+        loop = asyncio.get_running_loop()
+        while True:
+            doc = await self._snapshot_queue.get()
+            if doc is None:
+                return
+
+            batch = [doc]
+            stop = False
+            deadline = loop.time() + SNAPSHOT_FLUSH_INTERVAL
+            while len(batch) < SNAPSHOT_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    doc = await asyncio.wait_for(self._snapshot_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if doc is None:
+                    stop = True
+                    break
+                batch.append(doc)
+
+            await self._write_snapshot_batch(batch)
+
+            if stop:
+                return
+
+    async def _write_snapshot_batch(self, batch: List[Dict[str, Any]]):
+        """Insert a snapshot batch and bump session viewer totals in parallel"""
+        # Snapshots are telemetry, so skip waiting for write acknowledgements
+        unacked_snapshots = self.snapshots.with_options(
+            write_concern=WriteConcern(w=0)
         )
+        writes = [unacked_snapshots.insert_many(batch, ordered=False)]
+        session_updates = _session_viewer_updates(batch)
+        if session_updates:
+            writes.append(self.sessions.bulk_write(session_updates, ordered=False))
+
+        # The two collections are written concurrently; a failure in one
+        # does not hold back the other
+        results = await asyncio.gather(*writes, return_exceptions=True)
+        if isinstance(results[0], Exception):
+            logger.error(f"Failed to write {len(batch)} stream snapshots: {results[0]}")
+        if len(results) > 1 and isinstance(results[1], Exception):
+            logger.error(f"Failed to update session viewer totals: {results[1]}")
 
     async def _calculate_viewer_stats(self, session_id: str, ended_at: datetime = None) -> Dict[str, Any]:
         """Calculate viewer statistics for a session from snapshots taken during that session"""
         # Get the session details to find time range
-        session = await self.sessions.find_one({"_id": ObjectId(session_id)})
+        session = await self.sessions.find_one(
+            {"_id": ObjectId(session_id)},
+            projection={"broadcaster_id": 1, "started_at": 1, "ended_at": 1},
+        )
         if not session:
-            return {
-                "max_viewers": None,
-                "avg_viewers": None,
-                "viewer_count_samples": [],
-            }
+            return {"max_viewers": None, "avg_viewers": None}
 
         broadcaster_id = session["broadcaster_id"]
         started_at = session["started_at"]
 
         # Use provided ended_at or get from session or current time
         if ended_at is None:
-            ended_at = session.get("ended_at", datetime.now(timezone.utc))
-
-        # Handle timezone differences for MongoDB queries
-        if started_at.tzinfo is None:
-            # started_at is naive, convert ended_at to naive for comparison
-            ended_at = ended_at.replace(tzinfo=None) if ended_at.tzinfo is not None else ended_at
+            ended_at = session.get("ended_at") or datetime.now(timezone.utc)
 
         # Find snapshots within the session time range
         pipeline = [
@@ -239,83 +655,170 @@ class AnalyticsService:
                 "$match": {
                     "broadcaster_id": broadcaster_id,
                     "captured_at": {"$gte": started_at, "$lte": ended_at},
-                    "is_live": True,
-                    "viewer_count": {"$ne": None},
+                    **LIVE_VIEWER_FILTER,
                 }
             },
+            # Only index fields are used past this point, so the scan is covered
+            {"$project": {"_id": 0, "viewer_count": 1}},
             {
                 "$group": {
                     "_id": None,
                     "max_viewers": {"$max": "$viewer_count"},
                     "avg_viewers": {"$avg": "$viewer_count"},
-                    "viewer_samples": {
-                        "$push": {
-                            "timestamp": "$captured_at",
-                            "viewer_count": "$viewer_count",
-                        }
-                    },
+                    "viewer_sum": {"$sum": "$viewer_count"},
+                    "sample_count": {"$sum": 1},
                 }
             },
         ]
 
-        result = await self.snapshots.aggregate(pipeline).to_list(1)
+        cursor = await self.snapshots.aggregate(pipeline)
+        result = await cursor.to_list(1)
         if result and result[0]["max_viewers"] is not None:
             data = result[0]
             return {
                 "max_viewers": data.get("max_viewers"),
                 "avg_viewers": round(data.get("avg_viewers", 0), 2),
-                "viewer_count_samples": data.get("viewer_samples", []),
+                "viewer_sample_sum": data.get("viewer_sum", 0),
+                "viewer_sample_count": data.get("sample_count", 0),
             }
 
-        return {"max_viewers": None, "avg_viewers": None, "viewer_count_samples": []}
+        return {"max_viewers": None, "avg_viewers": None}
 
-    async def _update_streamer_stats(self, broadcaster_id: str):
-        """Update aggregated streamer statistics"""
-        # Calculate stats from all sessions (completed only for duration stats)
-        session_pipeline = [
-            {"$match": {"broadcaster_id": broadcaster_id}},
-            {
-                "$group": {
-                    "_id": None,
-                    "total_streams": {
-                        "$sum": {"$cond": [{"$ne": ["$ended_at", None]}, 1, 0]}
-                    },
-                    "total_minutes": {"$sum": {"$ifNull": ["$duration_minutes", 0]}},
-                    "avg_duration": {"$avg": {"$ifNull": ["$duration_minutes", None]}},
-                    "last_stream": {"$max": "$started_at"},
-                    "first_stream": {"$min": "$started_at"},
-                    "broadcaster_login": {"$first": "$broadcaster_login"},
-                    "broadcaster_name": {"$first": "$broadcaster_name"},
-                }
-            },
-        ]
+    async def _flush_dirty_stats(self):
+        """Background task that recomputes stats for recently ended streams"""
+        while True:
+            try:
+                await asyncio.sleep(STATS_DEBOUNCE_SECONDS)
+                await self._update_dirty_stats()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in streamer stats update task: {e}")
 
-        # Calculate viewer stats from snapshots directly
-        viewer_pipeline = [
+    async def _update_dirty_stats(self):
+        """Recompute stats once for every broadcaster marked dirty"""
+        dirty, self._dirty_broadcasters = self._dirty_broadcasters, set()
+        if not dirty:
+            return
+
+        semaphore = asyncio.Semaphore(STATS_RECOMPUTE_CONCURRENCY)
+
+        async def _recompute(broadcaster_id: str):
+            async with semaphore:
+                try:
+                    await self._update_streamer_stats(broadcaster_id)
+                except Exception as e:
+                    logger.error(
+                        f"Failed to update stats for broadcaster {broadcaster_id}: {e}"
+                    )
+
+        await asyncio.gather(*(_recompute(broadcaster_id) for broadcaster_id in dirty))
+
+    async def _apply_session_to_stats(
+        self,
+        session: Dict[str, Any],
+        started_at: datetime,
+        duration_minutes: int,
+        viewer_stats: Dict[str, Any],
+    ) -> bool:
+        """Incrementally add a completed session to the streamer's stats"""
+        broadcaster_id = session["broadcaster_id"]
+        max_viewers = viewer_stats.get("max_viewers") or 0
+
+        # Running sums are updated first, derived averages from them second
+        pipeline = [
             {
-                "$match": {
-                    "broadcaster_id": broadcaster_id,
-                    "is_live": True,
-                    "viewer_count": {"$ne": None},
+                "$set": {
+                    "broadcaster_login": session["broadcaster_login"],
+                    "broadcaster_name": session["broadcaster_name"],
+                    "total_streams": {"$add": ["$total_streams", 1]},
+                    "total_minutes": {"$add": ["$total_minutes", duration_minutes]},
+                    "viewer_sample_sum": {
+                        "$add": [
+                            "$viewer_sample_sum",
+                            viewer_stats.get("viewer_sample_sum", 0),
+                        ]
+                    },
+                    "viewer_sample_count": {
+                        "$add": [
+                            "$viewer_sample_count",
+                            viewer_stats.get("viewer_sample_count", 0),
+                        ]
+                    },
+                    "max_concurrent_viewers": {
+                        "$max": ["$max_concurrent_viewers", max_viewers]
+                    },
+                    "last_stream_at": {"$max": ["$last_stream_at", started_at]},
+                    "first_seen_at": {"$min": ["$first_seen_at", started_at]},
+                    "updated_at": datetime.now(timezone.utc),
                 }
             },
             {
-                "$group": {
-                    "_id": None,
-                    "max_viewers": {"$max": "$viewer_count"},
-                    "avg_viewers": {"$avg": "$viewer_count"},
+                "$set": {
+                    "total_hours_streamed": {
+                        "$round": [{"$divide": ["$total_minutes", 60]}, 2]
+                    },
+                    "avg_stream_duration_minutes": {
+                        "$round": [{"$divide": ["$total_minutes", "$total_streams"]}, 2]
+                    },
+                    "avg_viewers_all_time": {
+                        "$cond": [
+                            {"$gt": ["$viewer_sample_count", 0]},
+                            {
+                                "$round": [
+                                    {
+                                        "$divide": [
+                                            "$viewer_sample_sum",
+                                            "$viewer_sample_count",
+                                        ]
+                                    },
+                                    2,
+                                ]
+                            },
+                            0,
+                        ]
+                    },
                 }
             },
         ]
 
-        session_result = await self.sessions.aggregate(session_pipeline).to_list(1)
-        viewer_result = await self.snapshots.aggregate(viewer_pipeline).to_list(1)
+        # Only stats recomputed before this session started can be updated
+        # incrementally; missing or legacy documents need a full recompute
+        result = await self.stats.update_one(
+            {"broadcaster_id": broadcaster_id, "recomputed_at": {"$lt": started_at}},
+            pipeline,
+        )
+        if result.matched_count == 0:
+            return False
+
+        self._invalidate_stats_cache(session["broadcaster_login"])
+        return True
+
+    async def _update_streamer_stats(
+        self, broadcaster_id: str
+    ) -> Optional[Dict[str, Any]]:
+        """Update aggregated streamer statistics and return the stored document"""
+        # Calculate stats from all sessions (completed only for duration stats).
+        # Viewer totals come from the per-session sums stored when each session
+        # ended, since raw snapshots expire after SNAPSHOT_RETENTION_DAYS
+        session_pipeline = [
+            {"$match": {"broadcaster_id": broadcaster_id}},
+            # Walk the (broadcaster_id, started_at) index newest first so $first
+            # picks the broadcaster's current login and display name
+            {"$sort": {"started_at": -1}},
+            _session_stats_group(None),
+        ]
+
+        session_cursor = await self.sessions.aggregate(session_pipeline)
+        session_result = await session_cursor.to_list(1)
 
         if not session_result:
-            return
+            return None
 
         session_data = session_result[0]
-        viewer_data = viewer_result[0] if viewer_result else {}
+        sample_count = session_data["sample_count"]
+        avg_viewers = session_data["viewer_sum"] / sample_count if sample_count else 0
+        now = datetime.now(timezone.utc)
 
         stats = StreamerStats(
             broadcaster_id=broadcaster_id,
@@ -324,17 +827,32 @@ class AnalyticsService:
             total_streams=session_data["total_streams"],
             total_hours_streamed=round(session_data["total_minutes"] / 60, 2),
             avg_stream_duration_minutes=round(session_data["avg_duration"] or 0, 2),
-            max_concurrent_viewers=viewer_data.get("max_viewers", 0) or 0,
-            avg_viewers_all_time=round(viewer_data.get("avg_viewers", 0) or 0, 2),
+            max_concurrent_viewers=session_data["max_viewers"] or 0,
+            avg_viewers_all_time=round(avg_viewers, 2),
             last_stream_at=session_data["last_stream"],
             first_seen_at=session_data["first_stream"],
+            total_minutes=session_data["total_minutes"],
+            viewer_sample_sum=session_data["viewer_sum"],
+            viewer_sample_count=sample_count,
+            updated_at=now,
+            recomputed_at=now,
         )
 
-        await self.stats.update_one(
+        updated = await self.stats.find_one_and_update(
             {"broadcaster_id": broadcaster_id},
-            {"$set": stats.dict(by_alias=True, exclude_unset=True, exclude={"id"})},
+            {"$set": stats.model_dump(by_alias=True, exclude_unset=True, exclude={"id"})},
+            projection=STATS_PROJECTION,
             upsert=True,
+            return_document=ReturnDocument.AFTER,
         )
+        self._invalidate_stats_cache(stats.broadcaster_login)
+        updated["_id"] = str(updated["_id"])
+        return updated
+
+    def _invalidate_stats_cache(self, broadcaster_login: str):
+        """Drop cached stats reads after a streamer's stats change"""
+        self._stats_cache.pop(broadcaster_login, None)
+        self._top_streamers_cache.clear()
 
     async def get_streamer_stats(
         self, broadcaster_login: str
@@ -343,50 +861,134 @@ class AnalyticsService:
         if self.stats is None:
             raise RuntimeError("Analytics service not connected to MongoDB")
 
-        stats = await self.stats.find_one({"broadcaster_login": broadcaster_login})
+        cached = self._stats_cache.get(broadcaster_login)
+        if cached and time.monotonic() - cached[0] < STATS_CACHE_TTL:
+            return cached[1]
+
+        stats = await self.stats.find_one(
+            {"broadcaster_login": broadcaster_login}, projection=STATS_PROJECTION
+        )
         if stats:
             stats["_id"] = str(stats["_id"])
+            self._stats_cache[broadcaster_login] = (time.monotonic(), stats)
             return stats
         return None
 
-    async def get_stream_sessions(
+    async def iter_stream_sessions(
         self, broadcaster_login: str, limit: int = 50
-    ) -> List[Dict[str, Any]]:
-        """Get stream sessions for a broadcaster"""
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield stream sessions for a broadcaster as the cursor produces them"""
         if self.sessions is None:
             raise RuntimeError("Analytics service not connected to MongoDB")
 
         cursor = self.sessions.find(
             {"broadcaster_login": broadcaster_login},
+            projection=SESSION_PROJECTION,
             sort=[("started_at", -1)],
             limit=limit,
         )
+        try:
+            async for session in cursor:
+                yield session
+        finally:
+            await cursor.close()
+
+    async def get_session_viewer_samples(
+        self, session_id: str, max_points: int = MAX_VIEWER_SAMPLE_POINTS
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Get viewer count samples for a session, downsampled to max_points"""
+        if self.sessions is None or self.snapshots is None:
+            raise RuntimeError("Analytics service not connected to MongoDB")
+
+        if not ObjectId.is_valid(session_id):
+            return None
+
+        session = await self.sessions.find_one(
+            {"_id": ObjectId(session_id)},
+            projection={
+                "broadcaster_id": 1,
+                "started_at": 1,
+                "ended_at": 1,
+                "viewer_count_samples": 1,
+            },
+        )
+        if not session:
+            return None
 
-        sessions = []
-        async for session in cursor:
-            session["_id"] = str(session["_id"])
-            sessions.append(session)
+        started_at = session["started_at"]
+        ended_at = session.get("ended_at") or datetime.now(timezone.utc)
 
-        return sessions
+        samples = await self._bucket_viewer_samples(
+            session["broadcaster_id"], started_at, ended_at, max_points
+        )
+        # Raw snapshots expire; fall back to the series stored at session end
+        return samples or session.get("viewer_count_samples", [])
+
+    async def _bucket_viewer_samples(
+        self,
+        broadcaster_id: str,
+        started_at: datetime,
+        ended_at: datetime,
+        buckets: int,
+    ) -> List[Dict[str, Any]]:
+        """Downsample a broadcaster's viewer counts in a time range to buckets"""
+        # Match is served by the partial (broadcaster_id, captured_at, viewer_count)
+        # index; $bucketAuto keeps long streams to a bounded number of points
+        pipeline = [
+            {
+                "$match": {
+                    "broadcaster_id": broadcaster_id,
+                    "captured_at": {"$gte": started_at, "$lte": ended_at},
+                    **LIVE_VIEWER_FILTER,
+                }
+            },
+            {
+                "$bucketAuto": {
+                    "groupBy": "$captured_at",
+                    "buckets": buckets,
+                    "output": {
+                        "viewer_count": {"$avg": "$viewer_count"},
+                        "peak_viewers": {"$max": "$viewer_count"},
+                    },
+                }
+            },
+            {
+                "$project": {
+                    "_id": 0,
+                    "timestamp": "$_id.min",
+                    "viewer_count": {"$round": ["$viewer_count", 0]},
+                    "peak_viewers": 1,
+                }
+            },
+        ]
+        cursor = await self.snapshots.aggregate(pipeline)
+        return await cursor.to_list(None)
 
     async def get_top_streamers_by_hours(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get top streamers by total hours streamed"""
         if self.stats is None:
             raise RuntimeError("Analytics service not connected to MongoDB")
 
-        cursor = self.stats.find({}, sort=[("total_hours_streamed", -1)], limit=limit)
+        cached = self._top_streamers_cache.get(limit)
+        if cached and time.monotonic() - cached[0] < STATS_CACHE_TTL:
+            return cached[1]
+
+        cursor = self.stats.find(
+            {},
+            projection=TOP_STREAMER_PROJECTION,
+            sort=[("total_hours_streamed", -1)],
+            limit=limit,
+        )
 
-        streamers = []
-        async for streamer in cursor:
-            streamer["_id"] = str(streamer["_id"])
-            streamers.append(streamer)
+        streamers = await cursor.to_list(limit)
 
+        self._top_streamers_cache[limit] = (time.monotonic(), streamers)
         return streamers
 
-    async def get_recent_snapshots(
+    async def iter_recent_snapshots(
         self, broadcaster_login: str = None, limit: int = 100
-    ) -> List[Dict[str, Any]]:
-        """Get recent stream snapshots"""
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield recent stream snapshots as the cursor produces them"""
         if self.snapshots is None:
             raise RuntimeError("Analytics service not connected to MongoDB")
 
@@ -394,14 +996,17 @@ class AnalyticsService:
         if broadcaster_login:
             query["broadcaster_login"] = broadcaster_login
 
-        cursor = self.snapshots.find(query, sort=[("captured_at", -1)], limit=limit)
-
-        snapshots = []
-        async for snapshot in cursor:
-            snapshot["_id"] = str(snapshot["_id"])
-            snapshots.append(snapshot)
-
-        return snapshots
+        cursor = self.snapshots.find(
+            query,
+            projection=SNAPSHOT_PROJECTION,
+            sort=[("captured_at", -1)],
+            limit=limit,
+        )
+        try:
+            async for snapshot in cursor:
+                yield snapshot
+        finally:
+            await cursor.close()
 
     async def recalculate_streamer_stats(self, broadcaster_id: str) -> bool:
         """Force recalculation of streamer statistics"""
@@ -415,42 +1020,137 @@ class AnalyticsService:
             )
             return False
 
+    async def recalculate_streamer_stats_by_login(
+        self, broadcaster_login: str
+    ) -> Optional[Dict[str, Any]]:
+        """Recalculate a streamer's statistics and return the refreshed stats"""
+        if self.stats is None:
+            raise RuntimeError("Analytics service not connected to MongoDB")
+
+        existing = await self.stats.find_one(
+            {"broadcaster_login": broadcaster_login}, projection={"broadcaster_id": 1}
+        )
+        if not existing:
+            return None
+
+        # The recompute returns the stored document, so no follow-up read is needed
+        updated = await self._update_streamer_stats(existing["broadcaster_id"])
+        logger.info(f"Recalculated stats for broadcaster {existing['broadcaster_id']}")
+        return updated or await self.get_streamer_stats(broadcaster_login)
+
+    async def recalculate_all_streamer_stats(self) -> int:
+        """Rebuild every streamer's stats in one server-side aggregation"""
+        if self.sessions is None or self.stats is None:
+            raise RuntimeError("Analytics service not connected to MongoDB")
+
+        now = datetime.now(timezone.utc)
+        pipeline = [
+            # Newest first so $first picks each broadcaster's current login/name
+            {"$sort": {"started_at": -1}},
+            _session_stats_group("$broadcaster_id"),
+            {
+                "$project": {
+                    "_id": 0,
+                    "broadcaster_id": "$_id",
+                    "broadcaster_login": 1,
+                    "broadcaster_name": 1,
+                    "total_streams": 1,
+                    "total_hours_streamed": {
+                        "$round": [{"$divide": ["$total_minutes", 60]}, 2]
+                    },
+                    "avg_stream_duration_minutes": {
+                        "$round": [{"$ifNull": ["$avg_duration", 0]}, 2]
+                    },
+                    "max_concurrent_viewers": {"$ifNull": ["$max_viewers", 0]},
+                    "avg_viewers_all_time": {
+                        "$cond": [
+                            {"$gt": ["$sample_count", 0]},
+                            {
+                                "$round": [
+                                    {"$divide": ["$viewer_sum", "$sample_count"]},
+                                    2,
+                                ]
+                            },
+                            0,
+                        ]
+                    },
+                    "last_stream_at": "$last_stream",
+                    "first_seen_at": "$first_stream",
+                    "total_minutes": 1,
+                    "viewer_sample_sum": "$viewer_sum",
+                    "viewer_sample_count": "$sample_count",
+                    "updated_at": now,
+                    "recomputed_at": now,
+                }
+            },
+            # Upserts on the unique broadcaster_id index; nothing returns to Python
+            {
+                "$merge": {
+                    "into": self.stats.name,
+                    "on": "broadcaster_id",
+                    "whenMatched": "merge",
+                    "whenNotMatched": "insert",
+                }
+            },
+        ]
+        await self.sessions.aggregate(pipeline)
+
+        self._stats_cache.clear()
+        self._top_streamers_cache.clear()
+        self._summary_cache = None
+        return await self.stats.count_documents({"recomputed_at": now})
+
     async def end_old_active_sessions(self, max_age_hours: int = 24) -> int:
         """Delete active sessions that are older than the specified age"""
-        cutoff_time = datetime.now(timezone.utc) - timedelta(hours=max_age_hours)
+        return await self._delete_stale_active_sessions(
+            timedelta(hours=max_age_hours), "Deleted old stuck session"
+        )
+
+    async def cleanup_active_sessions(self, max_age_hours: int = 24) -> Tuple[int, int]:
+        """Delete stuck active sessions and create missing stats for the rest"""
+        # Stats are recomputed from the broadcaster's whole session history,
+        # so they must only be built once the stale sessions are gone
+        deleted_count = await self.end_old_active_sessions(max_age_hours)
+        stats_created = await self.create_stats_for_active_sessions()
+        return deleted_count, stats_created
+
+    async def _delete_stale_active_sessions(
+        self, max_age: timedelta, log_message: str
+    ) -> int:
+        """Delete active sessions started more than max_age ago in one delete_many"""
+        now = datetime.now(timezone.utc)
+        stale_filter = {**ACTIVE_SESSION_FILTER, "started_at": {"$lt": now - max_age}}
 
-        # Find old active sessions
         old_sessions = await self.sessions.find(
-            {"ended_at": None, "started_at": {"$lt": cutoff_time}}
+            stale_filter,
+            projection={"_id": 1, "broadcaster_login": 1, "started_at": 1},
         ).to_list(None)
+        if not old_sessions:
+            return 0
+
+        try:
+            result = await self.sessions.delete_many(
+                {"_id": {"$in": [session["_id"] for session in old_sessions]}}
+            )
+        except Exception as e:
+            logger.error(f"Failed to delete {len(old_sessions)} stuck sessions: {e}")
+            return 0
 
-        deleted_count = 0
         for session in old_sessions:
-            try:
-                # Delete the session directly instead of trying to end it properly
-                result = await self.sessions.delete_one({"_id": session["_id"]})
-                if result.deleted_count > 0:
-                    deleted_count += 1
-                    # Calculate age safely handling timezone differences
-                    now = datetime.now(timezone.utc)
-                    session_start = session['started_at']
-                    if session_start.tzinfo is None:
-                        now = now.replace(tzinfo=None)
-                    age_hours = (now - session_start).total_seconds() / 3600
-                    logger.info(f"Deleted old stuck session for {session['broadcaster_login']} (age: {age_hours:.1f}h)")
-                else:
-                    logger.warning(f"Failed to delete session for {session['broadcaster_login']}")
-            except Exception as e:
-                logger.error(f"Failed to delete session for {session['broadcaster_login']}: {e}")
+            age_hours = (now - session["started_at"]).total_seconds() / 3600
+            logger.info(
+                f"{log_message} for {session['broadcaster_login']} "
+                f"(age: {age_hours:.1f}h)"
+            )
 
-        return deleted_count
+        return result.deleted_count
 
     async def create_stats_for_active_sessions(self) -> int:
         """Create streamer stats for active sessions that don't have stats yet"""
         # Find active sessions where streamer doesn't have stats
         pipeline = [
             {
-                "$match": {"ended_at": None}
+                "$match": ACTIVE_SESSION_FILTER
             },
             {
                 "$lookup": {
@@ -465,113 +1165,85 @@ class AnalyticsService:
             }
         ]
 
-        active_sessions_without_stats = await self.sessions.aggregate(pipeline).to_list(None)
-
-        stats_created = 0
-        processed_streamers = set()
+        cursor = await self.sessions.aggregate(pipeline)
+        active_sessions_without_stats = await cursor.to_list(None)
 
-        for session in active_sessions_without_stats:
-            broadcaster_id = session["broadcaster_id"]
-            if broadcaster_id in processed_streamers:
-                continue
-
-            try:
-                await self._update_streamer_stats(broadcaster_id)
-                stats_created += 1
-                processed_streamers.add(broadcaster_id)
-                logger.info(f"Created stats for active session: {session['broadcaster_login']}")
-            except Exception as e:
-                logger.error(f"Failed to create stats for {session['broadcaster_login']}: {e}")
+        # One recompute per broadcaster, even with several open sessions
+        logins_by_id = {
+            session["broadcaster_id"]: session["broadcaster_login"]
+            for session in active_sessions_without_stats
+        }
+        semaphore = asyncio.Semaphore(STATS_RECOMPUTE_CONCURRENCY)
+
+        async def _create(broadcaster_id: str, broadcaster_login: str) -> bool:
+            async with semaphore:
+                try:
+                    await self._update_streamer_stats(broadcaster_id)
+                except Exception as e:
+                    logger.error(f"Failed to create stats for {broadcaster_login}: {e}")
+                    return False
+            logger.info(f"Created stats for active session: {broadcaster_login}")
+            return True
 
-        return stats_created
+        results = await asyncio.gather(
+            *(_create(bid, login) for bid, login in logins_by_id.items())
+        )
+        return sum(results)
 
     async def trigger_fallback_detection(self) -> int:
         """Manually trigger fallback detection for old active sessions"""
         # Find sessions that are very old (over 2 hours) and delete them
         # This is more aggressive than the background task's 10-minute threshold
-        cutoff_time = datetime.now(timezone.utc) - timedelta(hours=2)
-
-        old_sessions = await self.sessions.find(
-            {"ended_at": None, "started_at": {"$lt": cutoff_time}}
-        ).to_list(None)
-
-        deleted_count = 0
-        for session in old_sessions:
-            try:
-                # Delete the session directly instead of trying to end it properly
-                result = await self.sessions.delete_one({"_id": session["_id"]})
-                if result.deleted_count > 0:
-                    deleted_count += 1
-                    # Calculate age safely handling timezone differences
-                    now = datetime.now(timezone.utc)
-                    session_start = session['started_at']
-                    if session_start.tzinfo is None:
-                        now = now.replace(tzinfo=None)
-                    age_hours = (now - session_start).total_seconds() / 3600
-                    logger.info(
-                        f"Fallback: Deleted very old stuck session for {session['broadcaster_login']} "
-                        f"(age: {age_hours:.1f}h)"
-                    )
-                else:
-                    logger.warning(f"Failed to delete session for {session['broadcaster_login']}")
-            except Exception as e:
-                logger.error(f"Failed to delete session for {session['broadcaster_login']}: {e}")
-
-        return deleted_count
+        return await self._delete_stale_active_sessions(
+            timedelta(hours=2), "Fallback: Deleted very old stuck session"
+        )
 
     async def detect_missing_offline_events(self) -> Dict[str, Any]:
         """Detect streams that are offline but still have active sessions (missing offline events)"""
         try:
-            from app.storage import get_storage
-            storage = get_storage()
-            await storage.connect()
-
-            # Get currently live streams
-            live_streams = await storage.get_live_streams()
-            live_broadcaster_ids = {stream.user_id for stream in live_streams}
-
-            await storage.disconnect()
-
-            # Get active sessions
-            active_sessions = await self.sessions.find(
-                {"ended_at": None}
-            ).to_list(None)
+            # Live state lives in storage, not MongoDB, so the anti-join is a
+            # $nin over the live broadcaster ids; only orphaned sessions come back
+            live_streams = await self.storage.get_live_streams()
+            live_broadcaster_ids = [stream.user_id for stream in live_streams]
+
+            orphaned_sessions, total_active = await asyncio.gather(
+                self.sessions.find(
+                    {
+                        **ACTIVE_SESSION_FILTER,
+                        "broadcaster_id": {"$nin": live_broadcaster_ids},
+                    },
+                    projection={
+                        "broadcaster_id": 1,
+                        "broadcaster_login": 1,
+                        "started_at": 1,
+                    },
+                ).to_list(None),
+                self.sessions.count_documents(ACTIVE_SESSION_FILTER),
+            )
 
             missing_offline_events = []
-            valid_active_sessions = []
-
-            for session in active_sessions:
-                broadcaster_id = session["broadcaster_id"]
-                broadcaster_login = session["broadcaster_login"]
+            now = datetime.now(timezone.utc)
+            for session in orphaned_sessions:
+                # Stream is offline but session is still active - missing offline event!
                 started_at = session["started_at"]
-
-                # Check if this streamer is still live
-                if broadcaster_id not in live_broadcaster_ids:
-                    # Stream is offline but session is still active - missing offline event!
-                    # Handle timezone-aware vs naive datetime comparison
-                    now = datetime.now(timezone.utc)
-                    if started_at.tzinfo is None:
-                        # started_at is naive, make now naive too
-                        now = now.replace(tzinfo=None)
-
-                    duration_hours = (now - started_at).total_seconds() / 3600
-                    missing_offline_events.append({
-                        "broadcaster_login": broadcaster_login,
-                        "broadcaster_id": broadcaster_id,
-                        "session_started": started_at.isoformat(),
-                        "hours_active": round(duration_hours, 1),
-                        "session_id": str(session["_id"])
-                    })
-                else:
-                    # Stream is still live, session is valid
-                    valid_active_sessions.append(session)
-
+                duration_hours = (now - started_at).total_seconds() / 3600
+                missing_offline_events.append({
+                    "broadcaster_login": session["broadcaster_login"],
+                    "broadcaster_id": session["broadcaster_id"],
+                    "session_started": started_at.isoformat(),
+                    "hours_active": round(duration_hours, 1),
+                    "session_id": str(session["_id"])
+                })
+
+            missing_count = len(missing_offline_events)
             return {
                 "missing_offline_events": missing_offline_events,
-                "valid_active_sessions": len(valid_active_sessions),
-                "total_active_sessions": len(active_sessions),
-                "missing_count": len(missing_offline_events),
-                "missing_percentage": round((len(missing_offline_events) / len(active_sessions) * 100) if active_sessions else 0, 1)
+                "valid_active_sessions": max(total_active - missing_count, 0),
+                "total_active_sessions": total_active,
+                "missing_count": missing_count,
+                "missing_percentage": round(
+                    (missing_count / total_active * 100) if total_active else 0, 1
+                ),
             }
 
         except Exception as e:
@@ -583,13 +1255,9 @@ class AnalyticsService:
         if self.stats is None or self.sessions is None or self.snapshots is None:
             raise RuntimeError("Analytics service not connected to MongoDB")
 
-        total_streamers = await self.stats.count_documents({})
-        total_sessions = await self.sessions.count_documents({})
-        total_snapshots = await self.snapshots.count_documents({})
-
-        # Get session statistics
-        active_sessions = await self.sessions.count_documents({"ended_at": None})
-        completed_sessions = total_sessions - active_sessions
+        cached = self._summary_cache
+        if cached and time.monotonic() - cached[0] < SUMMARY_CACHE_TTL:
+            return cached[1]
 
         # Get total hours across all streamers
         pipeline = [
@@ -602,7 +1270,27 @@ class AnalyticsService:
             }
         ]
 
-        hours_result = await self.stats.aggregate(pipeline).to_list(1)
+        async def _hours() -> List[Dict[str, Any]]:
+            cursor = await self.stats.aggregate(pipeline)
+            return await cursor.to_list(1)
+
+        # Unfiltered totals come from collection metadata; run everything at once
+        (
+            total_streamers,
+            total_sessions,
+            total_snapshots,
+            active_sessions,
+            hours_result,
+        ) = await asyncio.gather(
+            self.stats.estimated_document_count(),
+            self.sessions.estimated_document_count(),
+            self.snapshots.estimated_document_count(),
+            self.sessions.count_documents(ACTIVE_SESSION_FILTER),
+            _hours(),
+        )
+        # The estimated total can briefly lag the exact active count
+        completed_sessions = max(total_sessions - active_sessions, 0)
+
         total_hours = 0
         avg_hours = 0
 
@@ -610,7 +1298,7 @@ class AnalyticsService:
             total_hours = round(hours_result[0].get("total_hours", 0), 2)
             avg_hours = round(hours_result[0].get("avg_hours_per_streamer", 0), 2)
 
-        return {
+        summary = {
             "total_streamers_tracked": total_streamers,
             "total_stream_sessions": total_sessions,
             "active_sessions": active_sessions,
@@ -619,61 +1307,49 @@ class AnalyticsService:
             "total_hours_streamed": total_hours,
             "avg_hours_per_streamer": avg_hours,
         }
+        self._summary_cache = (time.monotonic(), summary)
+        return summary
 
     async def get_comprehensive_summary(self) -> Dict[str, Any]:
         """Get comprehensive analytics summary including configured streamers"""
         if self.stats is None or self.sessions is None or self.snapshots is None:
             raise RuntimeError("Analytics service not connected to MongoDB")
 
-        # Get configured streamers from storage
-        storage = get_storage()
-        await storage.connect()
-        try:
-            configured_streamers = await storage.get_all_streamers()
-            total_configured = len(configured_streamers)
-        except Exception as e:
-            logger.warning(f"Could not get configured streamers count: {e}")
-            total_configured = 0
-        finally:
-            await storage.disconnect()
-
-        # Get analytics data
-        total_streamers = await self.stats.count_documents({})
-        total_sessions = await self.sessions.count_documents({})
-        total_snapshots = await self.snapshots.count_documents({})
-        active_sessions = await self.sessions.count_documents({"ended_at": None})
-        completed_sessions = total_sessions - active_sessions
-
-        # Get total hours across all streamers
-        pipeline = [
-            {
-                "$group": {
-                    "_id": None,
-                    "total_hours": {"$sum": "$total_hours_streamed"},
-                    "avg_hours_per_streamer": {"$avg": "$total_hours_streamed"},
-                }
-            }
-        ]
-
-        hours_result = await self.stats.aggregate(pipeline).to_list(1)
-        total_hours = 0
-        avg_hours = 0
+        async def _configured_count() -> int:
+            try:
+                return len(await self.storage.get_all_streamers())
+            except Exception as e:
+                logger.warning(f"Could not get configured streamers count: {e}")
+                return 0
 
-        if hours_result:
-            total_hours = round(hours_result[0].get("total_hours", 0), 2)
-            avg_hours = round(hours_result[0].get("avg_hours_per_streamer", 0), 2)
+        # Configured streamers come from storage, the totals from MongoDB
+        total_configured, summary = await asyncio.gather(
+            _configured_count(), self.get_analytics_summary()
+        )
+        total_streamers = summary["total_streamers_tracked"]
+        total_sessions = summary["total_stream_sessions"]
 
         return {
             "total_streamers_configured": total_configured,
             "total_streamers_tracked": total_streamers,
-            "tracking_coverage_percent": round((total_streamers / total_configured * 100) if total_configured > 0 else 0, 1),
+            "tracking_coverage_percent": round(
+                (total_streamers / total_configured * 100)
+                if total_configured > 0
+                else 0,
+                1,
+            ),
             "total_stream_sessions": total_sessions,
-            "active_sessions": active_sessions,
-            "completed_sessions": completed_sessions,
-            "session_completion_rate": round((completed_sessions / total_sessions * 100) if total_sessions > 0 else 0, 1),
-            "total_snapshots_captured": total_snapshots,
-            "total_hours_streamed": total_hours,
-            "avg_hours_per_streamer": avg_hours,
+            "active_sessions": summary["active_sessions"],
+            "completed_sessions": summary["completed_sessions"],
+            "session_completion_rate": round(
+                (summary["completed_sessions"] / total_sessions * 100)
+                if total_sessions > 0
+                else 0,
+                1,
+            ),
+            "total_snapshots_captured": summary["total_snapshots_captured"],
+            "total_hours_streamed": summary["total_hours_streamed"],
+            "avg_hours_per_streamer": summary["avg_hours_per_streamer"],
         }
 
 
@@ -1,6 +1,7 @@
 from datetime import datetime, timezone
+from functools import partial
 from typing import Optional, Dict, Any, Annotated
-from pydantic import BaseModel, Field, BeforeValidator
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field, PlainSerializer
 from bson import ObjectId
 
 
@@ -12,12 +13,15 @@ def validate_object_id(v):
     raise ValueError("Invalid ObjectId")
 
 
-def utc_now():
-    """Factory function for UTC datetime"""
-    return datetime.now(timezone.utc)
+# Shared aware-UTC factory for every timestamp default (no Python-level wrapper)
+utc_now = partial(datetime.now, timezone.utc)
 
 
-PyObjectId = Annotated[ObjectId, BeforeValidator(validate_object_id)]
+PyObjectId = Annotated[
+    ObjectId,
+    BeforeValidator(validate_object_id),
+    PlainSerializer(lambda v: str(v), return_type=str, when_used="json"),
+]
 
 
 class StreamSession(BaseModel):
@@ -31,16 +35,16 @@ class StreamSession(BaseModel):
     category_id: Optional[str] = None
     category_name: Optional[str] = None
     title: Optional[str] = None
+    # Bucketed viewer series stored when the session ends
     viewer_count_samples: list[Dict[str, Any]] = Field(default_factory=list)
     max_viewers: Optional[int] = None
     avg_viewers: Optional[float] = None
+    viewer_sample_sum: int = 0
+    viewer_sample_count: int = 0
     created_at: datetime = Field(default_factory=utc_now)
     updated_at: datetime = Field(default_factory=utc_now)
 
-    class Config:
-        populate_by_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str}
+    model_config = ConfigDict(populate_by_name=True, arbitrary_types_allowed=True)
 
 
 class StreamSnapshot(BaseModel):
@@ -57,13 +61,9 @@ class StreamSnapshot(BaseModel):
     started_at: Optional[datetime] = None
     language: Optional[str] = None
     thumbnail_url: Optional[str] = None
-    tag_ids: list[str] = Field(default_factory=list)
     captured_at: datetime = Field(default_factory=utc_now)
 
-    class Config:
-        populate_by_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str}
+    model_config = ConfigDict(populate_by_name=True, arbitrary_types_allowed=True)
 
 
 class StreamerStats(BaseModel):
@@ -79,8 +79,10 @@ class StreamerStats(BaseModel):
     last_stream_at: Optional[datetime] = None
     first_seen_at: datetime = Field(default_factory=utc_now)
     updated_at: datetime = Field(default_factory=utc_now)
+    # Running totals used to update the averages above incrementally
+    total_minutes: int = 0
+    viewer_sample_sum: int = 0
+    viewer_sample_count: int = 0
+    recomputed_at: Optional[datetime] = None
 
-    class Config:
-        populate_by_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str}
+    model_config = ConfigDict(populate_by_name=True, arbitrary_types_allowed=True)
@@ -1,3 +1,4 @@
+import hmac
 from fastapi import HTTPException, Security, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.config import settings
@@ -5,15 +6,14 @@ from app.config import settings
 # Security scheme for API key authentication
 api_key_header = HTTPBearer(auto_error=False)
 
+# Expected key, encoded once for constant-time comparison
+_API_KEY_BYTES = settings.API_KEY.encode("utf-8")
 
-async def verify_api_key(
+
+async def _verify_api_key(
     credentials: HTTPAuthorizationCredentials = Security(api_key_header),
 ):
     """Verify API key for protected endpoints"""
-    # Skip verification if API key protection is disabled
-    if not settings.REQUIRE_API_KEY:
-        return True
-
     # Check if API key is configured
     if not settings.API_KEY:
         raise HTTPException(
@@ -28,10 +28,20 @@ async def verify_api_key(
             detail="API key required. Provide in Authorization header as 'Bearer YOUR_API_KEY'",
         )
 
-    # Verify the API key
-    if credentials.credentials != settings.API_KEY:
+    # Verify the API key in constant time
+    provided = credentials.credentials.encode("utf-8", errors="replace")
+    if not hmac.compare_digest(provided, _API_KEY_BYTES):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid API key"
         )
 
     return True
+
+
+async def _skip_api_key() -> bool:
+    """Accept every request when API key protection is disabled"""
+    return True
+
+
+# Bound once at import so disabled auth skips the bearer header dependency
+verify_api_key = _verify_api_key if settings.REQUIRE_API_KEY else _skip_api_key
@@ -1,35 +1,46 @@
-import os
-from pydantic_settings import BaseSettings
+from functools import cached_property
+
+from pydantic import AliasChoices, Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
+    # Environment is read once by pydantic-settings; values are frozen after startup
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore", frozen=True)
+
     # Twitch API credentials
-    CLIENT_ID: str = os.getenv("TWITCH_CLIENT_ID", "")
-    CLIENT_SECRET: str = os.getenv("TWITCH_CLIENT_SECRET", "")
+    CLIENT_ID: str = Field("", validation_alias=AliasChoices("TWITCH_CLIENT_ID"))
+    CLIENT_SECRET: str = Field(
+        "", validation_alias=AliasChoices("TWITCH_CLIENT_SECRET")
+    )
 
     # EventSub webhook configuration
-    WEBHOOK_SECRET: str = os.getenv("WEBHOOK_SECRET", "your-webhook-secret")
-    WEBHOOK_URL: str = os.getenv(
-        "WEBHOOK_URL", "https://your-domain.com/webhooks/eventsub"
-    )
+    WEBHOOK_SECRET: str = "your-webhook-secret"
+    WEBHOOK_URL: str = "https://your-domain.com/webhooks/eventsub"
 
     # Storage configuration
-    STORAGE_TYPE: str = os.getenv("STORAGE_TYPE", "memory")  # "redis" or "memory"
-    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379")
+    STORAGE_TYPE: str = "memory"  # "redis" or "memory"
+    REDIS_URL: str = "redis://localhost:6379"
 
     # MongoDB configuration for analytics
-    MONGODB_URL: str = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
-    MONGODB_DATABASE: str = os.getenv("MONGODB_DATABASE", "twitch_analytics")
+    MONGODB_URL: str = "mongodb://localhost:27017"
+    MONGODB_DATABASE: str = "twitch_analytics"
+    # Async driver needs far fewer connections than the driver default of 100
+    MONGODB_MAX_POOL_SIZE: int = 16
+    # Days to keep raw stream snapshots before MongoDB expires them (0 keeps forever)
+    SNAPSHOT_RETENTION_DAYS: int = 30
 
     # Default streamers to monitor
-    DEFAULT_STREAMERS: str = os.getenv("DEFAULT_STREAMERS", "")
+    DEFAULT_STREAMERS: str = ""
 
-    # API Security
-    REQUIRE_API_KEY: bool = os.getenv("REQUIRE_API_KEY", "false").lower() == "true"
-    API_KEY: str = os.getenv("API_KEY", "")
+    @cached_property
+    def DEFAULT_STREAMERS_LIST(self) -> tuple[str, ...]:
+        """Default streamer usernames, parsed once from DEFAULT_STREAMERS"""
+        return tuple(s.strip() for s in self.DEFAULT_STREAMERS.split(",") if s.strip())
 
-    class Config:
-        env_file = ".env"
+    # API Security
+    REQUIRE_API_KEY: bool = False
+    API_KEY: str = ""
 
 
 settings = Settings()
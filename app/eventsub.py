@@ -1,7 +1,19 @@
 import hmac
 import hashlib
+from functools import lru_cache
 from typing import Dict
 
+# "sha256=" followed by a 64-character hex digest
+SIGNATURE_HEADER_LENGTH = 71
+# EventSub notifications are a few KB; anything far larger is not from Twitch
+MAX_BODY_BYTES = 1024 * 1024
+
+
+@lru_cache(maxsize=4)
+def _keyed_mac(secret: str) -> hmac.HMAC:
+    """Build the keyed HMAC once; requests copy it instead of re-keying"""
+    return hmac.new(secret.encode("utf-8"), digestmod=hashlib.sha256)
+
 
 def verify_signature(headers: Dict[str, str], body: bytes, secret: str) -> bool:
     """Verify Twitch EventSub webhook signature"""
@@ -9,23 +21,33 @@ def verify_signature(headers: Dict[str, str], body: bytes, secret: str) -> bool:
         # Get the signature from headers
         signature = headers.get("Twitch-Eventsub-Message-Signature", "")
 
-        # Extract the signature value (remove 'sha256=' prefix)
-        if not signature.startswith("sha256="):
+        # Reject malformed requests on header shape before doing any HMAC work
+        if len(signature) != SIGNATURE_HEADER_LENGTH or not signature.startswith(
+            "sha256="
+        ):
+            return False
+        if len(body) > MAX_BODY_BYTES:
             return False
 
-        received_signature = signature[7:]  # Remove 'sha256=' prefix
+        # Remove 'sha256=' prefix and compare raw digest bytes, not hex
+        try:
+            received_signature = bytes.fromhex(signature[7:])
+        except ValueError:
+            return False
 
         # Get other required headers
         message_id = headers.get("Twitch-Eventsub-Message-Id", "")
         timestamp = headers.get("Twitch-Eventsub-Message-Timestamp", "")
+        if not message_id or not timestamp:
+            return False
 
-        # Create the message to verify
-        message = message_id + timestamp + body.decode("utf-8")
-
-        # Calculate expected signature
-        expected_signature = hmac.new(
-            secret.encode("utf-8"), message.encode("utf-8"), hashlib.sha256
-        ).hexdigest()
+        # Feed message_id + timestamp + body into the HMAC piecewise so the
+        # body stays as bytes instead of being decoded and re-encoded
+        mac = _keyed_mac(secret).copy()
+        mac.update(message_id.encode("utf-8"))
+        mac.update(timestamp.encode("utf-8"))
+        mac.update(body)
+        expected_signature = mac.digest()
 
         # Compare signatures
         return hmac.compare_digest(received_signature, expected_signature)
@@ -1,18 +1,40 @@
 from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import logging
 import asyncio
 from typing import Optional
 from contextlib import asynccontextmanager
+import atexit
 import time
+import queue
+from logging.handlers import QueueHandler, QueueListener
 
 from app.storage import get_storage
-from app.streamers import StreamerManager
+from app.streamers import get_streamer_manager
 from app.analytics import analytics_service
+from app.utils import get_real_ip
 
 # Import route modules
 from app.routes import basic, webhooks, streamers, events, streams, admin, analytics
 
-logging.basicConfig(level=logging.INFO)
+# Handlers only enqueue records; a listener thread does the actual stream writes
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+_log_listener = QueueListener(
+    _log_queue, _log_stream_handler, respect_handler_level=True
+)
+# Root gets a bare QueueHandler: its prepare() still merges msg % args on the
+# calling (event loop) thread, but the line layout and the stream write happen
+# on the listener thread
+logging.root.addHandler(QueueHandler(_log_queue))
+# Start the writer together with the handler so records logged without the app
+# lifespan (scripts, TestClient without a context manager) are still written;
+# stop at exit flushes whatever is still queued
+_log_listener.start()
+atexit.register(_log_listener.stop)
+logging.root.setLevel(logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Set HTTPX to ERROR level only to reduce verbosity
@@ -21,35 +43,10 @@ logging.getLogger("httpx").setLevel(logging.ERROR)
 # Disable uvicorn access logging since we have our own middleware
 logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
 
-streamer_manager = StreamerManager()
+streamer_manager = get_streamer_manager()
 _initialization_task: Optional[asyncio.Task] = None
 
 
-def get_real_ip(request: Request) -> str:
-    """Extract the real client IP from request headers"""
-    # Check Cloudflare header first (most specific)
-    cf_connecting_ip = request.headers.get("CF-Connecting-IP")
-    if cf_connecting_ip:
-        return cf_connecting_ip
-
-    # Check X-Forwarded-For header (standard proxy header)
-    x_forwarded_for = request.headers.get("X-Forwarded-For")
-    if x_forwarded_for:
-        # X-Forwarded-For can contain multiple IPs, take the first one (original client)
-        return x_forwarded_for.split(",")[0].strip()
-
-    # Check X-Real-IP header (Nginx)
-    x_real_ip = request.headers.get("X-Real-IP")
-    if x_real_ip:
-        return x_real_ip
-
-    # Fall back to direct client IP
-    if request.client:
-        return request.client.host
-
-    return "unknown"
-
-
 async def _initialize_in_background():
     """Initialize streamers in background to avoid blocking startup"""
     try:
@@ -68,6 +65,10 @@ async def lifespan(app: FastAPI):
     logger.info("Starting up Twitch EventSub server...")
     storage = get_storage()
     await storage.connect()
+    # Routes read the connected handle from app state instead of the factory
+    app.state.storage = storage
+    # Admin routes share the manager's Twitch client (token + connection pool)
+    app.state.twitch_api = streamer_manager.twitch_api
 
     # Connect analytics service
     await analytics_service.connect()
@@ -95,6 +96,7 @@ app = FastAPI(
     description="A REST API server for listening to Twitch EventSub events",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Include all route modules
@@ -107,23 +109,55 @@ app.include_router(admin.router)
 app.include_router(analytics.router)
 
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
+class RequestLoggingMiddleware:
     """Log requests with real IP addresses"""
-    client_ip = get_real_ip(request)
-    start_time = time.time()
-
-    # Call the endpoint
-    response = await call_next(request)
-
-    # Log the request
-    process_time_ms = (time.time() - start_time) * 1000
-    logger.info(
-        f'{client_ip} - "{request.method} {request.url.path}" '
-        f"{response.status_code} - {process_time_ms:.1f}ms"
-    )
 
-    return response
+    # Plain ASGI middleware: no BaseHTTPMiddleware task/stream wrapping per request
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Skip IP extraction and timing entirely when access logs would be dropped
+        if scope["type"] != "http" or not logger.isEnabledFor(logging.INFO):
+            await self.app(scope, receive, send)
+            return
+
+        client_ip = get_real_ip(Request(scope))
+        status_code = 500
+        start_ns = time.perf_counter_ns()
+        end_ns = None
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code, end_ns
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+            # Background tasks run after the last body chunk, before the app
+            # returns, so latency is measured up to the end of the response
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                end_ns = time.perf_counter_ns()
+
+        # Call the endpoint
+        await self.app(scope, receive, send_with_status)
+
+        # Log the request
+        if end_ns is None:
+            end_ns = time.perf_counter_ns()
+        process_time_ms = (end_ns - start_ns) / 1_000_000
+        # Lazy %-formatting so nothing is built when INFO is filtered out
+        logger.info(
+            '%s - "%s %s" %d - %.1fms',
+            client_ip,
+            scope["method"],
+            scope["path"],
+            status_code,
+            process_time_ms,
+        )
+
+
+app.add_middleware(RequestLoggingMiddleware)
 
 
 if __name__ == "__main__":
@@ -1,9 +1,12 @@
+import msgspec
 from pydantic import BaseModel
 from typing import Dict, Any, Optional
 from datetime import datetime
 
 
-class EventSubSubscription(BaseModel):
+# Webhook ingress types are msgspec Structs so the raw body decodes and
+# validates in a single pass
+class EventSubSubscription(msgspec.Struct, frozen=True):
     id: str
     status: str
     type: str
@@ -35,14 +38,16 @@ class StreamOfflineEvent(EventSubEvent):
     broadcaster_user_name: str
 
 
-class EventSubNotification(BaseModel):
+class EventSubNotification(msgspec.Struct, frozen=True):
+    """EventSub webhook message; challenge is only set on verification requests"""
+
     subscription: EventSubSubscription
-    event: Dict[str, Any]
+    event: Optional[Dict[str, Any]] = None
+    challenge: Optional[str] = None
 
 
-class EventSubChallenge(BaseModel):
-    challenge: str
-    subscription: EventSubSubscription
+# Shared decoder for webhook bodies
+eventsub_decoder = msgspec.json.Decoder(EventSubNotification)
 
 
 class StreamEvent(BaseModel):
@@ -1,24 +1,39 @@
+import asyncio
 import logging
 from fastapi import APIRouter, HTTPException, Depends
 
 from app.auth import verify_api_key
 from app.config import settings
-from app.streamers import StreamerManager
+from app.streamers import StreamerManager, get_streamer_manager
+from app.twitch_api import TwitchAPI, get_twitch_api
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/admin")
 
-# Use a new instance - should be refactored to use dependency injection
-streamer_manager = StreamerManager()
+# Default streamers re-added at once by /admin/reload-default-streamers
+RELOAD_STREAMERS_CONCURRENCY = 10
+
+
+def _summarize_subscription(sub: dict) -> dict:
+    """Pick the subscription fields shown by the admin listing"""
+    get = sub.get
+    return {
+        "id": get("id"),
+        "type": get("type"),
+        "status": get("status"),
+        "condition": get("condition"),
+        "created_at": get("created_at"),
+        "cost": get("cost", 0),
+    }
 
 
 @router.post("/cleanup-subscriptions")
-async def cleanup_subscriptions(api_key_valid: bool = Depends(verify_api_key)):
+async def cleanup_subscriptions(
+    api_key_valid: bool = Depends(verify_api_key),
+    twitch_api: TwitchAPI = Depends(get_twitch_api),
+):
     """Manually cleanup EventSub subscriptions for our webhook URL"""
     try:
-        from app.twitch_api import TwitchAPI
-
-        twitch_api = TwitchAPI()
         cleanup_count = await twitch_api.cleanup_webhook_subscriptions()
         return {
             "message": f"Cleaned up {cleanup_count} EventSub subscriptions",
@@ -30,41 +45,27 @@ async def cleanup_subscriptions(api_key_valid: bool = Depends(verify_api_key)):
 
 
 @router.get("/subscriptions")
-async def get_current_subscriptions(api_key_valid: bool = Depends(verify_api_key)):
+async def get_current_subscriptions(
+    api_key_valid: bool = Depends(verify_api_key),
+    twitch_api: TwitchAPI = Depends(get_twitch_api),
+):
     """Get all current EventSub subscriptions"""
     try:
-        from app.twitch_api import TwitchAPI
+        subscriptions, costs = await asyncio.gather(
+            twitch_api.get_eventsub_subscriptions(), twitch_api.get_eventsub_costs()
+        )
 
-        twitch_api = TwitchAPI()
-        subscriptions = await twitch_api.get_eventsub_subscriptions()
-        costs = await twitch_api.get_eventsub_costs()
-
-        # Filter to show only our webhook subscriptions and add details
+        # Split our webhook subscriptions from the rest, building each entry once
+        webhook_url = settings.WEBHOOK_URL
         our_subscriptions = []
         other_subscriptions = []
         for sub in subscriptions:
-            if sub.get("transport", {}).get("callback") == settings.WEBHOOK_URL:
-                our_subscriptions.append(
-                    {
-                        "id": sub.get("id"),
-                        "type": sub.get("type"),
-                        "status": sub.get("status"),
-                        "condition": sub.get("condition"),
-                        "created_at": sub.get("created_at"),
-                        "cost": sub.get("cost", 0),
-                    }
-                )
-            else:
-                other_subscriptions.append(
-                    {
-                        "id": sub.get("id"),
-                        "type": sub.get("type"),
-                        "status": sub.get("status"),
-                        "condition": sub.get("condition"),
-                        "created_at": sub.get("created_at"),
-                        "cost": sub.get("cost", 0),
-                    }
-                )
+            target = (
+                our_subscriptions
+                if sub.get("transport", {}).get("callback") == webhook_url
+                else other_subscriptions
+            )
+            target.append(_summarize_subscription(sub))
 
         return {
             "subscriptions": our_subscriptions,
@@ -72,7 +73,7 @@ async def get_current_subscriptions(api_key_valid: bool = Depends(verify_api_key
             "total_subscriptions": len(subscriptions),
             "our_subscriptions_count": len(our_subscriptions),
             "other_subscriptions_count": len(other_subscriptions),
-            "webhook_url": settings.WEBHOOK_URL,
+            "webhook_url": webhook_url,
             "costs": costs,
         }
     except Exception as e:
@@ -81,7 +82,10 @@ async def get_current_subscriptions(api_key_valid: bool = Depends(verify_api_key
 
 
 @router.post("/verify-subscriptions")
-async def verify_all_subscriptions(api_key_valid: bool = Depends(verify_api_key)):
+async def verify_all_subscriptions(
+    api_key_valid: bool = Depends(verify_api_key),
+    streamer_manager: StreamerManager = Depends(get_streamer_manager),
+):
     """Re-verify and fix EventSub subscriptions for all tracked streamers"""
     try:
         await streamer_manager.validate_and_fix_subscriptions()
@@ -92,27 +96,43 @@ async def verify_all_subscriptions(api_key_valid: bool = Depends(verify_api_key)
 
 
 @router.post("/reload-default-streamers")
-async def reload_default_streamers(api_key_valid: bool = Depends(verify_api_key)):
+async def reload_default_streamers(
+    api_key_valid: bool = Depends(verify_api_key),
+    streamer_manager: StreamerManager = Depends(get_streamer_manager),
+):
     """Re-add all default streamers from configuration"""
     try:
-        if not settings.DEFAULT_STREAMERS:
+        # Twitch logins are case-insensitive; concurrent adds of one streamer
+        # would all pass the exists check and subscribe it more than once
+        unique_streamers: dict[str, str] = {}
+        for username in settings.DEFAULT_STREAMERS_LIST:
+            unique_streamers.setdefault(username.lower(), username)
+        default_streamers = list(unique_streamers.values())
+        if not default_streamers:
             return {"message": "No default streamers configured", "added_count": 0}
 
-        default_streamers = [
-            s.strip() for s in settings.DEFAULT_STREAMERS.split(",") if s.strip()
-        ]
+        # Add streamers concurrently, bounded to stay inside Twitch rate limits
+        semaphore = asyncio.Semaphore(RELOAD_STREAMERS_CONCURRENCY)
+
+        async def add_one(username: str):
+            async with semaphore:
+                return await streamer_manager.add_streamer(username)
+
+        results = await asyncio.gather(
+            *(add_one(username) for username in default_streamers),
+            return_exceptions=True,
+        )
 
         added_count = 0
         failed_streamers = []
 
-        for username in default_streamers:
-            try:
-                await streamer_manager.add_streamer(username)
+        for username, result in zip(default_streamers, results):
+            if isinstance(result, Exception):
+                failed_streamers.append({"username": username, "error": str(result)})
+                logger.error(f"Failed to re-add default streamer {username}: {result}")
+            else:
                 added_count += 1
                 logger.info(f"Re-added default streamer: {username}")
-            except Exception as e:
-                failed_streamers.append({"username": username, "error": str(e)})
-                logger.error(f"Failed to re-add default streamer {username}: {e}")
 
         result = {
             "message": f"Re-added {added_count} default streamers",
@@ -131,12 +151,12 @@ async def reload_default_streamers(api_key_valid: bool = Depends(verify_api_key)
 
 
 @router.post("/delete-all-subscriptions")
-async def delete_all_subscriptions(api_key_valid: bool = Depends(verify_api_key)):
+async def delete_all_subscriptions(
+    api_key_valid: bool = Depends(verify_api_key),
+    twitch_api: TwitchAPI = Depends(get_twitch_api),
+):
     """Delete ALL EventSub subscriptions (WARNING: affects all callback URLs)"""
     try:
-        from app.twitch_api import TwitchAPI
-
-        twitch_api = TwitchAPI()
         deleted_count = await twitch_api.delete_all_subscriptions()
         return {
             "message": f"Deleted {deleted_count} total EventSub subscriptions",
@@ -1,67 +1,64 @@
 import logging
-import traceback
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
+from fastapi.responses import ORJSONResponse
 from typing import Optional
 
-from app.analytics import analytics_service
-from app.streamers import StreamerManager
-
-# Get the global streamer manager instance
-streamer_manager = StreamerManager()
+from app.analytics import analytics_service, SUMMARY_CACHE_TTL, STATS_CACHE_TTL
+from app.streamers import StreamerManager, get_streamer_manager
+from app.utils import json_array_response, etag_json_response
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/analytics")
 
 
 @router.get("/summary")
-async def get_analytics_summary():
+async def get_analytics_summary(request: Request):
     """Get overall analytics summary"""
     try:
         summary = await analytics_service.get_analytics_summary()
-        return summary
+        return etag_json_response(request, summary, SUMMARY_CACHE_TTL)
     except Exception as e:
-        logger.error(f"Error getting analytics summary: {type(e).__name__}: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception(f"Error getting analytics summary: {type(e).__name__}: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.get("/comprehensive-summary")
-async def get_comprehensive_summary():
+async def get_comprehensive_summary(request: Request):
     """Get comprehensive analytics summary including configured streamers"""
     try:
         summary = await analytics_service.get_comprehensive_summary()
-        return summary
+        return etag_json_response(request, summary, SUMMARY_CACHE_TTL)
     except Exception as e:
-        logger.error(f"Error getting comprehensive summary: {type(e).__name__}: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception(f"Error getting comprehensive summary: {type(e).__name__}: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.get("/eventsub-diagnostics")
-async def get_eventsub_diagnostics():
+async def get_eventsub_diagnostics(
+    request: Request,
+    streamer_manager: StreamerManager = Depends(get_streamer_manager),
+):
     """Get diagnostics about EventSub subscription status"""
     try:
         diagnostics = await streamer_manager.get_eventsub_diagnostics()
-        return diagnostics
+        return etag_json_response(request, diagnostics, SUMMARY_CACHE_TTL)
     except Exception as e:
-        logger.error(f"Error getting EventSub diagnostics: {type(e).__name__}: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception(f"Error getting EventSub diagnostics: {type(e).__name__}: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@router.get("/missing-offline-events")
+@router.get("/missing-offline-events", response_class=ORJSONResponse)
 async def detect_missing_offline_events():
     """Detect streams that have active sessions but are no longer live (missing offline events)"""
     try:
         result = await analytics_service.detect_missing_offline_events()
-        return result
+        return ORJSONResponse(result)
     except Exception as e:
-        logger.error(f"Error detecting missing offline events: {type(e).__name__}: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception(f"Error detecting missing offline events: {type(e).__name__}: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@router.get("/streamer/{broadcaster_login}/stats")
+@router.get("/streamer/{broadcaster_login}/stats", response_class=ORJSONResponse)
 async def get_streamer_stats(broadcaster_login: str):
     """Get statistics for a specific streamer"""
     try:
@@ -71,66 +68,93 @@ async def get_streamer_stats(broadcaster_login: str):
                 status_code=404,
                 detail=f"No analytics data found for {broadcaster_login}",
             )
-        return stats
+        # Stats rows carry a string _id and native datetimes, so orjson encodes directly
+        return ORJSONResponse(stats)
     except HTTPException:
         raise  # Re-raise HTTP exceptions as-is
     except Exception as e:
-        logger.error(
+        logger.exception(
             f"Error getting streamer stats for {broadcaster_login}: {type(e).__name__}: {str(e)}"
         )
-        logger.error(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@router.get("/streamer/{broadcaster_login}/sessions")
+@router.get("/streamer/{broadcaster_login}/sessions", response_class=ORJSONResponse)
 async def get_stream_sessions(
     broadcaster_login: str, limit: int = Query(50, ge=1, le=500)
 ):
     """Get stream sessions for a broadcaster"""
     try:
-        sessions = await analytics_service.get_stream_sessions(broadcaster_login, limit)
-        return {
-            "broadcaster_login": broadcaster_login,
-            "sessions": sessions,
-            "count": len(sessions),
-        }
+        return await json_array_response(
+            "sessions",
+            analytics_service.iter_stream_sessions(broadcaster_login, limit),
+            broadcaster_login=broadcaster_login,
+        )
     except Exception as e:
-        logger.error(
+        logger.exception(
             f"Error getting stream sessions for {broadcaster_login}: {type(e).__name__}: {str(e)}"
         )
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get(
+    "/sessions/{session_id}/viewer-samples", response_class=ORJSONResponse
+)
+async def get_session_viewer_samples(
+    session_id: str, max_points: int = Query(500, ge=1, le=2000)
+):
+    """Get viewer count samples captured during a stream session"""
+    try:
+        samples = await analytics_service.get_session_viewer_samples(
+            session_id, max_points
+        )
+        if samples is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Stream session {session_id} not found",
+            )
+        return ORJSONResponse(
+            {"session_id": session_id, "samples": samples, "count": len(samples)}
+        )
+    except HTTPException:
+        raise  # Re-raise HTTP exceptions as-is
+    except Exception as e:
+        logger.exception(
+            f"Error getting viewer samples for session {session_id}: {type(e).__name__}: {str(e)}"
+        )
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.get("/top-streamers/hours")
-async def get_top_streamers_by_hours(limit: int = Query(10, ge=1, le=50)):
+async def get_top_streamers_by_hours(
+    request: Request, limit: int = Query(10, ge=1, le=50)
+):
     """Get top streamers by total hours streamed"""
     try:
         streamers = await analytics_service.get_top_streamers_by_hours(limit)
-        return {"top_streamers": streamers, "count": len(streamers)}
+        return etag_json_response(
+            request,
+            {"top_streamers": streamers, "count": len(streamers)},
+            STATS_CACHE_TTL,
+        )
     except Exception as e:
-        logger.error(f"Error getting top streamers: {type(e).__name__}: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception(f"Error getting top streamers: {type(e).__name__}: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@router.get("/snapshots")
+@router.get("/snapshots", response_class=ORJSONResponse)
 async def get_recent_snapshots(
     broadcaster_login: Optional[str] = None, limit: int = Query(100, ge=1, le=1000)
 ):
     """Get recent stream snapshots"""
     try:
-        snapshots = await analytics_service.get_recent_snapshots(
-            broadcaster_login, limit
+        return await json_array_response(
+            "snapshots",
+            analytics_service.iter_recent_snapshots(broadcaster_login, limit),
+            broadcaster_login=broadcaster_login,
         )
-        return {
-            "snapshots": snapshots,
-            "count": len(snapshots),
-            "broadcaster_login": broadcaster_login,
-        }
     except Exception as e:
-        logger.error(f"Error getting snapshots: {type(e).__name__}: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception(f"Error getting snapshots: {type(e).__name__}: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
@@ -138,11 +162,10 @@ async def get_recent_snapshots(
 async def cleanup_sessions(max_age_hours: int = 24):
     """Clean up old active sessions and create stats for active sessions"""
     try:
-        # Delete old active sessions
-        deleted_count = await analytics_service.end_old_active_sessions(max_age_hours)
-
-        # Create stats for active sessions that don't have them
-        stats_created = await analytics_service.create_stats_for_active_sessions()
+        # Delete old active sessions and create stats for the remaining ones
+        deleted_count, stats_created = await analytics_service.cleanup_active_sessions(
+            max_age_hours
+        )
 
         return {
             "message": f"Cleanup completed: deleted {deleted_count} old sessions, created {stats_created} new stats",
@@ -150,8 +173,7 @@ async def cleanup_sessions(max_age_hours: int = 24):
             "stats_created": stats_created,
         }
     except Exception as e:
-        logger.error(f"Error during cleanup: {type(e).__name__}: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception(f"Error during cleanup: {type(e).__name__}: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
@@ -166,8 +188,23 @@ async def trigger_fallback_detection():
             "sessions_deleted": deleted_count,
         }
     except Exception as e:
-        logger.error(f"Error during fallback detection: {type(e).__name__}: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception(f"Error during fallback detection: {type(e).__name__}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.post("/recalculate-all")
+async def recalculate_all_streamer_stats():
+    """Rebuild statistics for every streamer from their stream sessions"""
+    try:
+        streamers_updated = await analytics_service.recalculate_all_streamer_stats()
+        return {
+            "message": f"Recalculated stats for {streamers_updated} streamers",
+            "streamers_updated": streamers_updated,
+        }
+    except Exception as e:
+        logger.exception(
+            f"Error recalculating all streamer stats: {type(e).__name__}: {str(e)}"
+        )
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
@@ -175,25 +212,15 @@ async def trigger_fallback_detection():
 async def recalculate_streamer_stats(broadcaster_login: str):
     """Force recalculation of statistics for a specific streamer"""
     try:
-        # First, get the streamer stats to find broadcaster_id
-        existing_stats = await analytics_service.get_streamer_stats(broadcaster_login)
-        if not existing_stats:
+        updated_stats = await analytics_service.recalculate_streamer_stats_by_login(
+            broadcaster_login
+        )
+        if not updated_stats:
             raise HTTPException(
                 status_code=404,
                 detail=f"No analytics data found for {broadcaster_login}",
             )
 
-        broadcaster_id = existing_stats["broadcaster_id"]
-        success = await analytics_service.recalculate_streamer_stats(broadcaster_id)
-
-        if not success:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to recalculate stats for {broadcaster_login}",
-            )
-
-        # Return the updated stats
-        updated_stats = await analytics_service.get_streamer_stats(broadcaster_login)
         return {
             "message": f"Successfully recalculated stats for {broadcaster_login}",
             "stats": updated_stats,
@@ -201,8 +228,7 @@ async def recalculate_streamer_stats(broadcaster_login: str):
     except HTTPException:
         raise  # Re-raise HTTP exceptions as-is
     except Exception as e:
-        logger.error(
+        logger.exception(
             f"Error recalculating stats for {broadcaster_login}: {type(e).__name__}: {str(e)}"
         )
-        logger.error(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -1,9 +1,21 @@
-from fastapi import APIRouter
-from app.storage import get_storage
+import asyncio
+from fastapi import APIRouter, Depends
 from app.analytics import analytics_service
+from app.storage import StorageInterface, get_app_storage
 
 router = APIRouter()
 
+# Seconds each dependency gets before /health reports it as disconnected
+HEALTH_CHECK_TIMEOUT = 2.0
+
+
+async def _check(probe) -> bool:
+    """Run one health probe, treating errors and timeouts as unhealthy"""
+    try:
+        return bool(await asyncio.wait_for(probe, HEALTH_CHECK_TIMEOUT))
+    except Exception:
+        return False
+
 
 @router.get("/")
 async def root():
@@ -11,10 +23,11 @@ async def root():
 
 
 @router.get("/health")
-async def health_check():
-    storage = get_storage()
-    storage_status = await storage.health_check()
-    mongodb_status = await analytics_service.health_check()
+async def health_check(storage: StorageInterface = Depends(get_app_storage)):
+    # Probe both backends at once so a slow one can't delay the other
+    storage_status, mongodb_status = await asyncio.gather(
+        _check(storage.health_check()), _check(analytics_service.health_check())
+    )
 
     overall_healthy = storage_status and mongodb_status
 
@@ -1,33 +1,33 @@
-from fastapi import APIRouter, HTTPException
-from app.storage import get_storage
+from fastapi import APIRouter, Depends, HTTPException
+from app.storage import StorageInterface, get_app_storage
+from app.streamers import HANDLED_EVENT_TYPES
 
 router = APIRouter(prefix="/events")
 
 
 @router.get("")
-async def get_recent_events(limit: int = 50):
+async def get_recent_events(
+    limit: int = 50, storage: StorageInterface = Depends(get_app_storage)
+):
     """Get recent stream events"""
-    storage = get_storage()
     events = await storage.get_recent_events(limit)
     return {"events": events}
 
 
 @router.get("/type/{event_type}")
-async def get_events_by_type(event_type: str, limit: int = 50):
+async def get_events_by_type(
+    event_type: str,
+    limit: int = 50,
+    storage: StorageInterface = Depends(get_app_storage),
+):
     """Get recent stream events filtered by event type (stream.online or stream.offline)"""
-    if event_type not in ["stream.online", "stream.offline"]:
+    if event_type not in HANDLED_EVENT_TYPES:
         raise HTTPException(
             status_code=400,
             detail="event_type must be 'stream.online' or 'stream.offline'",
         )
 
-    storage = get_storage()
-    all_events = await storage.get_recent_events(limit * 3)  # Get more to filter from
-
-    # Filter events by type
-    filtered_events = [
-        event for event in all_events if event.get("event_type") == event_type
-    ][:limit]
+    filtered_events = await storage.get_events_by_type(event_type, limit)
 
     return {
         "events": filtered_events,
@@ -37,17 +37,13 @@ async def get_events_by_type(event_type: str, limit: int = 50):
 
 
 @router.get("/streamer/{username}")
-async def get_events_by_streamer(username: str, limit: int = 50):
+async def get_events_by_streamer(
+    username: str,
+    limit: int = 50,
+    storage: StorageInterface = Depends(get_app_storage),
+):
     """Get recent stream events filtered by streamer username"""
-    storage = get_storage()
-    all_events = await storage.get_recent_events(limit * 3)  # Get more to filter from
-
-    # Filter events by streamer (case-insensitive)
-    filtered_events = [
-        event
-        for event in all_events
-        if event.get("broadcaster_login", "").lower() == username.lower()
-    ][:limit]
+    filtered_events = await storage.get_events_by_streamer(username, limit)
 
     return {
         "events": filtered_events,
@@ -2,23 +2,27 @@ import logging
 from fastapi import APIRouter, HTTPException, Depends
 
 from app.auth import verify_api_key
-from app.streamers import StreamerManager
+from app.streamers import StreamerManager, get_streamer_manager
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/streamers")
 
-# Use a new instance - should be refactored to use dependency injection
-streamer_manager = StreamerManager()
-
 
 @router.get("")
-async def get_streamers(api_key_valid: bool = Depends(verify_api_key)):
+async def get_streamers(
+    api_key_valid: bool = Depends(verify_api_key),
+    streamer_manager: StreamerManager = Depends(get_streamer_manager),
+):
     """Get list of configured streamers"""
     return await streamer_manager.get_streamers()
 
 
 @router.post("/{username}")
-async def add_streamer(username: str, api_key_valid: bool = Depends(verify_api_key)):
+async def add_streamer(
+    username: str,
+    api_key_valid: bool = Depends(verify_api_key),
+    streamer_manager: StreamerManager = Depends(get_streamer_manager),
+):
     """Add a streamer to monitor"""
     try:
         await streamer_manager.add_streamer(username)
@@ -29,7 +33,11 @@ async def add_streamer(username: str, api_key_valid: bool = Depends(verify_api_k
 
 
 @router.delete("/{username}")
-async def remove_streamer(username: str, api_key_valid: bool = Depends(verify_api_key)):
+async def remove_streamer(
+    username: str,
+    api_key_valid: bool = Depends(verify_api_key),
+    streamer_manager: StreamerManager = Depends(get_streamer_manager),
+):
     """Remove a streamer from monitoring"""
     try:
         await streamer_manager.remove_streamer(username)
@@ -40,7 +48,10 @@ async def remove_streamer(username: str, api_key_valid: bool = Depends(verify_ap
 
 
 @router.get("/{username}/status")
-async def get_streamer_status(username: str):
+async def get_streamer_status(
+    username: str,
+    streamer_manager: StreamerManager = Depends(get_streamer_manager),
+):
     """Get current stream status for a streamer"""
     try:
         status = await streamer_manager.get_stream_status(username)
@@ -1,17 +1,16 @@
 import logging
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 
-from app.streamers import StreamerManager
+from app.streamers import StreamerManager, get_streamer_manager
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/streams")
 
-# Use a new instance - should be refactored to use dependency injection
-streamer_manager = StreamerManager()
-
 
 @router.get("/live")
-async def get_live_streams():
+async def get_live_streams(
+    streamer_manager: StreamerManager = Depends(get_streamer_manager),
+):
     """Get all currently live streams"""
     try:
         live_streams = await streamer_manager.get_live_streams()
@@ -1,62 +1,159 @@
 import logging
 import asyncio
+import time
+import msgspec
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone, timedelta
-from collections import defaultdict
-from fastapi import APIRouter, HTTPException, Request
+from collections import Counter, OrderedDict, defaultdict, deque
+from itertools import islice
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
 from fastapi.responses import Response
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from app.config import settings
-from app.models import EventSubNotification, EventSubChallenge
+from app.models import EventSubNotification, eventsub_decoder
 from app.eventsub import verify_signature
-from app.streamers import StreamerManager
+from app.streamers import HANDLED_EVENT_TYPES, StreamerManager, get_streamer_manager
+from app.utils import get_real_ip
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/webhooks")
 
-# Use the global streamer manager instance - we'll get it from main.py
-# For now, create a new instance - this should be refactored to use dependency injection
-streamer_manager = StreamerManager()
+# Bound once so the signature check skips the settings lookup per request
+WEBHOOK_SECRET = settings.WEBHOOK_SECRET
+
+# Twitch retries deliveries it thinks failed; remember accepted message ids
+# for this long (seconds) so a retry is acknowledged without reprocessing
+SEEN_MESSAGE_TTL = 600
+MAX_SEEN_MESSAGES = 10000
+
+# Message id -> monotonic time it was accepted, oldest first
+_seen_messages: "OrderedDict[str, float]" = OrderedDict()
+
+
+def _already_accepted(message_id: str) -> bool:
+    """Check whether a message id was accepted within SEEN_MESSAGE_TTL"""
+    expire_before = time.monotonic() - SEEN_MESSAGE_TTL
+    while _seen_messages:
+        oldest_id, seen_at = next(iter(_seen_messages.items()))
+        if seen_at >= expire_before:
+            break
+        del _seen_messages[oldest_id]
+    return message_id in _seen_messages
+
+
+def _mark_accepted(message_id: str) -> None:
+    """Remember an accepted message id, evicting the oldest past the cap"""
+    _seen_messages[message_id] = time.monotonic()
+    _seen_messages.move_to_end(message_id)
+    if len(_seen_messages) > MAX_SEEN_MESSAGES:
+        _seen_messages.popitem(last=False)
+
+
+# (unix second, ISO string) for the last second a webhook timestamp was formatted
+_iso_second_cache = (0, "")
+
+
+def _now_iso() -> str:
+    """Current UTC time as ISO 8601, formatted at most once per second"""
+    global _iso_second_cache
+    now_second = int(time.time())
+    if _iso_second_cache[0] != now_second:
+        _iso_second_cache = (
+            now_second,
+            datetime.fromtimestamp(now_second, tz=timezone.utc).isoformat(),
+        )
+    return _iso_second_cache[1]
+
+
+# Events processed at once after their webhooks were acknowledged
+MAX_CONCURRENT_EVENTS = 200
+_event_semaphore = asyncio.Semaphore(MAX_CONCURRENT_EVENTS)
+
+# One lock per broadcaster so their online/offline events are applied one at
+# a time, in the order processing started (asyncio.Lock wakes waiters FIFO).
+# Entries are dropped once no event for that broadcaster holds or awaits them.
+_broadcaster_locks: Dict[str, asyncio.Lock] = {}
+_broadcaster_lock_users: Dict[str, int] = defaultdict(int)
+
+
+@asynccontextmanager
+async def _broadcaster_lock(broadcaster_id: str):
+    """Hold a broadcaster's event lock, pruning it when nobody else needs it"""
+    lock = _broadcaster_locks.setdefault(broadcaster_id, asyncio.Lock())
+    _broadcaster_lock_users[broadcaster_id] += 1
+    try:
+        async with lock:
+            yield
+    finally:
+        _broadcaster_lock_users[broadcaster_id] -= 1
+        if not _broadcaster_lock_users[broadcaster_id]:
+            del _broadcaster_lock_users[broadcaster_id]
+            del _broadcaster_locks[broadcaster_id]
+
+
+class WebhookStats:
+    """In-process webhook counters, updated from the event loop thread only"""
+
+    # Fixed slots make each counter bump a plain attribute store
+    __slots__ = (
+        "events_received",
+        "events_processed",
+        "events_failed",
+        "events_by_type",
+        "errors_by_type",
+        "recent_events",
+        "start_time",
+    )
+
+    def __init__(self):
+        self.events_received = 0
+        self.events_processed = 0
+        self.events_failed = 0
+        self.events_by_type: Dict[str, int] = defaultdict(int)
+        self.errors_by_type: Dict[str, int] = defaultdict(int)
+        # Oldest entries drop off automatically
+        self.recent_events: deque = deque(maxlen=100)
+        self.start_time = datetime.now(timezone.utc)
+
 
 # Global webhook diagnostics tracking
-webhook_stats = {
-    "events_received": 0,
-    "events_processed": 0,
-    "events_failed": 0,
-    "events_by_type": defaultdict(int),
-    "errors_by_type": defaultdict(int),
-    "recent_events": [],
-    "start_time": datetime.now(timezone.utc)
-}
-
-
-def get_real_ip(request: Request) -> str:
-    """Extract the real client IP from request headers"""
-    # Check Cloudflare header first (most specific)
-    cf_connecting_ip = request.headers.get("CF-Connecting-IP")
-    if cf_connecting_ip:
-        return cf_connecting_ip
-
-    # Check X-Forwarded-For header (standard proxy header)
-    x_forwarded_for = request.headers.get("X-Forwarded-For")
-    if x_forwarded_for:
-        # X-Forwarded-For can contain multiple IPs, take the first one (original client)
-        return x_forwarded_for.split(",")[0].strip()
-
-    # Check X-Real-IP header (Nginx)
-    x_real_ip = request.headers.get("X-Real-IP")
-    if x_real_ip:
-        return x_real_ip
-
-    # Fall back to direct client IP
-    if request.client:
-        return request.client.host
-
-    return "unknown"
+webhook_stats = WebhookStats()
+
+# Seconds a built /diagnostics response is reused for dashboards polling it
+DIAGNOSTICS_CACHE_TTL = 1.0
+_diagnostics_cache: Optional[tuple[float, Dict[str, Any]]] = None
+
+
+async def _process_event(
+    streamer_manager: StreamerManager,
+    notification: EventSubNotification,
+    broadcaster_login: str,
+    event_id: str,
+) -> None:
+    """Process an acknowledged EventSub notification in the background"""
+    event_type = notification.subscription.type
+    broadcaster_id = notification.event.get("broadcaster_user_id", broadcaster_login)
+    try:
+        async with _broadcaster_lock(broadcaster_id), _event_semaphore:
+            await streamer_manager.handle_event(notification)
+
+        webhook_stats.events_processed += 1
+        logger.info(f"Successfully processed event: {event_type} for {broadcaster_login}")
+    except Exception as e:
+        webhook_stats.events_failed += 1
+        webhook_stats.errors_by_type[str(type(e).__name__)] += 1
+
+        logger.error(f"Error processing webhook event {event_type} for {broadcaster_login} (event_id: {event_id}): {str(e)}")
+        logger.error(f"Webhook payload was: {notification}")
 
 
 @router.post("/eventsub")
-async def eventsub_webhook(request: Request):
+async def eventsub_webhook(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    streamer_manager: StreamerManager = Depends(get_streamer_manager),
+):
     """Handle Twitch EventSub webhook notifications"""
     event_type = "unknown"
     broadcaster_login = "unknown"
@@ -67,108 +164,137 @@ async def eventsub_webhook(request: Request):
         body = await request.body()
         client_ip = get_real_ip(request)
 
-        logger.debug(f"Received webhook request from {client_ip}: {headers}")
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        if debug_enabled:
+            logger.debug(
+                "Received webhook request from %s: %s", client_ip, dict(headers)
+            )
 
         # Verify the signature
-        if not verify_signature(headers, body, settings.WEBHOOK_SECRET):
+        if not verify_signature(headers, body, WEBHOOK_SECRET):
             logger.warning(f"Invalid webhook signature from {client_ip}")
             raise HTTPException(status_code=403, detail="Invalid signature")
 
-        # Parse the JSON payload
-        payload = await request.json()
-        logger.debug(f"Received webhook payload: {payload}")
+        # Acknowledge redeliveries of messages we already handled without
+        # decoding or processing them again
+        message_id = headers.get("Twitch-Eventsub-Message-Id", "")
+        if _already_accepted(message_id):
+            logger.info(f"Ignoring duplicate EventSub message {message_id}")
+            return {"status": "duplicate"}
+
+        # Decode and validate the body already read for the signature in one pass
+        try:
+            notification = eventsub_decoder.decode(body)
+        except msgspec.DecodeError as e:
+            logger.warning(f"Malformed webhook payload from {client_ip}: {e}")
+            raise HTTPException(status_code=400, detail="Invalid payload")
+        if debug_enabled:
+            logger.debug("Received webhook payload: %s", notification)
 
         # Handle challenge verification
-        if "challenge" in payload:
-            challenge = EventSubChallenge(**payload)
+        challenge_value = notification.challenge
+        if challenge_value is not None:
             logger.info(
-                f"Received EventSub challenge from {client_ip}: {challenge.challenge}"
+                f"Received EventSub challenge from {client_ip}: {challenge_value}"
             )
 
             # Return raw challenge
-            challenge_value = challenge.challenge
             return Response(
                 content=challenge_value,
                 status_code=200,
                 headers={"Content-Type": "text/plain"},
             )
 
-        # Handle notification
-        notification = EventSubNotification(**payload)
-        event_type = notification.subscription.type
-        event_id = notification.event.get("id", "no-id")
+        # Skip event types we never dispatch and messages without an event
+        subscription_type = notification.subscription.type
+        if (
+            subscription_type not in HANDLED_EVENT_TYPES
+            or notification.event is None
+        ):
+            logger.warning(f"Ignoring unhandled event type: {subscription_type}")
+            return {"status": "ignored"}
+
+        # Handle notification; event is the plain dict decoded from the body
+        event_type = subscription_type
+        event = notification.event
+        event_id = event.get("id", "no-id")
 
         # Extract broadcaster info for logging
-        if hasattr(notification.event, 'broadcaster_user_login'):
-            broadcaster_login = notification.event.broadcaster_user_login
-        elif "broadcaster_user_login" in notification.event:
-            broadcaster_login = notification.event["broadcaster_user_login"]
+        broadcaster_login = event.get("broadcaster_user_login", broadcaster_login)
 
         # Track webhook statistics
-        webhook_stats["events_received"] += 1
-        webhook_stats["events_by_type"][event_type] += 1
+        webhook_stats.events_received += 1
+        webhook_stats.events_by_type[event_type] += 1
 
-        # Add to recent events (keep last 100)
-        webhook_stats["recent_events"].append({
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+        # Add to recent events (the deque keeps the last 100)
+        webhook_stats.recent_events.append({
+            "timestamp": _now_iso(),
             "event_type": event_type,
             "broadcaster_login": broadcaster_login,
             "event_id": event_id,
             "client_ip": client_ip
         })
-        if len(webhook_stats["recent_events"]) > 100:
-            webhook_stats["recent_events"] = webhook_stats["recent_events"][-100:]
 
         logger.info(f"Processing webhook event: {event_type} for {broadcaster_login} (event_id: {event_id})")
 
-        # Process the event
-        await streamer_manager.handle_event(notification)
-
-        webhook_stats["events_processed"] += 1
-        logger.info(f"Successfully processed event: {event_type} for {broadcaster_login}")
+        # Acknowledge now and process after the response is sent; Twitch only
+        # waits for the 2xx, so it will not redeliver an accepted message
+        _mark_accepted(message_id)
+        background_tasks.add_task(
+            _process_event, streamer_manager, notification, broadcaster_login, event_id
+        )
         return {"status": "success"}
 
+    except HTTPException:
+        raise
     except Exception as e:
-        webhook_stats["events_failed"] += 1
-        webhook_stats["errors_by_type"][str(type(e).__name__)] += 1
+        webhook_stats.events_failed += 1
+        webhook_stats.errors_by_type[str(type(e).__name__)] += 1
 
         logger.error(f"Error processing webhook event {event_type} for {broadcaster_login} (event_id: {event_id}): {str(e)}")
-        logger.error(f"Webhook payload was: {payload if 'payload' in locals() else 'not available'}")
+        logger.error(f"Webhook payload was: {notification if 'notification' in locals() else 'not available'}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.get("/diagnostics")
 async def get_webhook_diagnostics():
     """Get webhook diagnostics and statistics"""
+    global _diagnostics_cache
+    cached = _diagnostics_cache
+    if cached and time.monotonic() - cached[0] < DIAGNOSTICS_CACHE_TTL:
+        return cached[1]
+
     now = datetime.now(timezone.utc)
-    uptime = now - webhook_stats["start_time"]
+    uptime = now - webhook_stats.start_time
 
     # Calculate rates
     uptime_hours = uptime.total_seconds() / 3600
-    events_per_hour = webhook_stats["events_received"] / uptime_hours if uptime_hours > 0 else 0
-    failure_rate = (webhook_stats["events_failed"] / webhook_stats["events_received"] * 100) if webhook_stats["events_received"] > 0 else 0
+    events_per_hour = webhook_stats.events_received / uptime_hours if uptime_hours > 0 else 0
+    failure_rate = (webhook_stats.events_failed / webhook_stats.events_received * 100) if webhook_stats.events_received > 0 else 0
 
     # Get recent events summary
-    recent_online = sum(1 for e in webhook_stats["recent_events"][-20:] if e["event_type"] == "stream.online")
-    recent_offline = sum(1 for e in webhook_stats["recent_events"][-20:] if e["event_type"] == "stream.offline")
+    last_20_events = list(islice(reversed(webhook_stats.recent_events), 20))[::-1]
+    recent_counts = Counter(e["event_type"] for e in last_20_events)
+    recent_online = recent_counts["stream.online"]
+    recent_offline = recent_counts["stream.offline"]
 
-    return {
+    diagnostics = {
         "uptime": {
-            "started_at": webhook_stats["start_time"].isoformat(),
+            "started_at": webhook_stats.start_time.isoformat(),
             "uptime_seconds": uptime.total_seconds(),
             "uptime_formatted": f"{uptime.days}d {uptime.seconds//3600}h {(uptime.seconds%3600)//60}m"
         },
         "event_counts": {
-            "total_received": webhook_stats["events_received"],
-            "total_processed": webhook_stats["events_processed"],
-            "total_failed": webhook_stats["events_failed"],
+            "total_received": webhook_stats.events_received,
+            "total_processed": webhook_stats.events_processed,
+            "total_failed": webhook_stats.events_failed,
             "events_per_hour": round(events_per_hour, 2),
             "failure_rate_percent": round(failure_rate, 2)
         },
-        "events_by_type": dict(webhook_stats["events_by_type"]),
-        "errors_by_type": dict(webhook_stats["errors_by_type"]),
+        "events_by_type": dict(webhook_stats.events_by_type),
+        "errors_by_type": dict(webhook_stats.errors_by_type),
         "recent_activity": {
-            "last_20_events": webhook_stats["recent_events"][-20:],
+            "last_20_events": last_20_events,
             "recent_online_events": recent_online,
             "recent_offline_events": recent_offline,
             "online_offline_ratio": f"{recent_online}:{recent_offline}"
@@ -176,6 +302,8 @@ async def get_webhook_diagnostics():
         "health_status": {
             "overall_health": "healthy" if failure_rate < 5 else "warning" if failure_rate < 15 else "critical",
             "event_balance": "balanced" if abs(recent_online - recent_offline) <= 2 else "unbalanced",
-            "processing_efficiency": round((webhook_stats["events_processed"] / webhook_stats["events_received"] * 100) if webhook_stats["events_received"] > 0 else 100, 2)
+            "processing_efficiency": round((webhook_stats.events_processed / webhook_stats.events_received * 100) if webhook_stats.events_received > 0 else 100, 2)
         }
     }
+    _diagnostics_cache = (time.monotonic(), diagnostics)
+    return diagnostics
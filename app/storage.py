@@ -1,12 +1,28 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
-import json
+from collections import deque
+from itertools import islice
+from typing import List, Dict, Any, Deque, Optional
+import orjson
 from datetime import datetime
 import redis.asyncio as redis
+from fastapi import Request
 from app.config import settings
 from app.models import StreamEvent, Streamer, StreamStatus
 
 
+def _event_to_dict(event: StreamEvent) -> Dict[str, Any]:
+    """Convert a stream event to the dict shape returned by the events API"""
+    return {
+        "id": event.id,
+        "event_type": event.event_type,
+        "broadcaster_id": event.broadcaster_id,
+        "broadcaster_login": event.broadcaster_login,
+        "broadcaster_name": event.broadcaster_name,
+        "timestamp": event.timestamp.isoformat(),
+        "data": event.data,
+    }
+
+
 class StorageInterface(ABC):
     """Abstract storage interface"""
 
@@ -35,6 +51,20 @@ class StorageInterface(ABC):
         """Get recent stream events"""
         pass
 
+    @abstractmethod
+    async def get_events_by_type(
+        self, event_type: str, limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Get recent stream events of one event type"""
+        pass
+
+    @abstractmethod
+    async def get_events_by_streamer(
+        self, username: str, limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Get recent stream events for one streamer (case-insensitive)"""
+        pass
+
     @abstractmethod
     async def store_streamer(self, streamer: Streamer) -> None:
         """Store streamer configuration"""
@@ -60,6 +90,13 @@ class StorageInterface(ABC):
         """Store current stream status"""
         pass
 
+    @abstractmethod
+    async def store_event_and_status(
+        self, event: StreamEvent, status: StreamStatus
+    ) -> None:
+        """Store a stream event together with the stream status it produced"""
+        pass
+
     @abstractmethod
     async def get_stream_status(self, username: str) -> Optional[StreamStatus]:
         """Get current stream status"""
@@ -75,7 +112,9 @@ class MemoryStorage(StorageInterface):
     """In-memory storage for testing"""
 
     def __init__(self):
-        self.events: List[StreamEvent] = []
+        # Events are kept in their API dict shape, formatted once when stored;
+        # the deque keeps only the last 1000
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=1000)
         self.streamers: Dict[str, Streamer] = {}
         self.stream_statuses: Dict[str, StreamStatus] = {}
         self.connected = False
@@ -90,27 +129,31 @@ class MemoryStorage(StorageInterface):
         return self.connected
 
     async def store_event(self, event: StreamEvent) -> None:
-        self.events.append(event)
-        # Keep only last 1000 events
-        if len(self.events) > 1000:
-            self.events = self.events[-1000:]
+        self.events.append(_event_to_dict(event))
 
     async def get_recent_events(self, limit: int = 50) -> List[Dict[str, Any]]:
-        recent_events = (
-            self.events[-limit:] if limit <= len(self.events) else self.events
+        return list(islice(reversed(self.events), limit))
+
+    async def get_events_by_type(
+        self, event_type: str, limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        matches = (
+            event
+            for event in reversed(self.events)
+            if event["event_type"] == event_type
         )
-        return [
-            {
-                "id": event.id,
-                "event_type": event.event_type,
-                "broadcaster_id": event.broadcaster_id,
-                "broadcaster_login": event.broadcaster_login,
-                "broadcaster_name": event.broadcaster_name,
-                "timestamp": event.timestamp.isoformat(),
-                "data": event.data,
-            }
-            for event in reversed(recent_events)
-        ]
+        return list(islice(matches, limit))
+
+    async def get_events_by_streamer(
+        self, username: str, limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        target = username.lower()
+        matches = (
+            event
+            for event in reversed(self.events)
+            if event["broadcaster_login"].lower() == target
+        )
+        return list(islice(matches, limit))
 
     async def store_streamer(self, streamer: Streamer) -> None:
         self.streamers[streamer.username] = streamer
@@ -130,6 +173,12 @@ class MemoryStorage(StorageInterface):
     async def store_stream_status(self, status: StreamStatus) -> None:
         self.stream_statuses[status.username] = status
 
+    async def store_event_and_status(
+        self, event: StreamEvent, status: StreamStatus
+    ) -> None:
+        await self.store_event(event)
+        await self.store_stream_status(status)
+
     async def get_stream_status(self, username: str) -> Optional[StreamStatus]:
         return self.stream_statuses.get(username)
 
@@ -140,15 +189,57 @@ class MemoryStorage(StorageInterface):
 class RedisStorage(StorageInterface):
     """Redis storage implementation"""
 
+    # Values are orjson bytes on write; redis-py passes bytes through unencoded
+
     def __init__(self):
         self.redis_client: Optional[redis.Redis] = None
-        self.events_key = "twitch:events"
+        self.events_key = "twitch:event_stream"
+        # Sorted set that held events before the stream; migrated on connect
+        self.legacy_events_key = "twitch:events"
         self.streamers_key = "twitch:streamers"
         self.status_key = "twitch:stream_status"
+        # Usernames whose stored status is live, kept in step with status_key
+        self.live_key = "twitch:live_streams"
 
     async def connect(self) -> None:
         self.redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
         await self.redis_client.ping()
+        await self._migrate_legacy_events()
+        await self._rebuild_live_set()
+
+    async def _migrate_legacy_events(self) -> None:
+        """Move events from the old sorted set into the event streams, oldest first"""
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            try:
+                # Another worker migrating at the same time aborts this one
+                await pipe.watch(self.legacy_events_key)
+                if await pipe.type(self.legacy_events_key) != "zset":
+                    return
+                legacy_events = await pipe.zrange(self.legacy_events_key, 0, -1)
+
+                # Index streams are backfilled along with the main stream
+                pipe.multi()
+                for event_json in legacy_events:
+                    self._queue_event_data(pipe, orjson.loads(event_json))
+                pipe.delete(self.legacy_events_key)
+                await pipe.execute()
+            except redis.WatchError:
+                pass
+
+    async def _rebuild_live_set(self) -> None:
+        """Rebuild the live username set from the stored stream statuses"""
+        all_status_data = await self.redis_client.hgetall(self.status_key)
+        live_usernames = [
+            username
+            for username, data in all_status_data.items()
+            if orjson.loads(data).get("is_live")
+        ]
+
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.delete(self.live_key)
+            if live_usernames:
+                pipe.sadd(self.live_key, *live_usernames)
+            await pipe.execute()
 
     async def disconnect(self) -> None:
         if self.redis_client:
@@ -167,32 +258,68 @@ class RedisStorage(StorageInterface):
         if not self.redis_client:
             raise RuntimeError("Redis client not connected")
 
-        event_data = {
-            "id": event.id,
-            "event_type": event.event_type,
-            "broadcaster_id": event.broadcaster_id,
-            "broadcaster_login": event.broadcaster_login,
-            "broadcaster_name": event.broadcaster_name,
-            "timestamp": event.timestamp.isoformat(),
-            "data": event.data,
-        }
-
-        # Store event with timestamp as score for ordering
-        await self.redis_client.zadd(
-            self.events_key, {json.dumps(event_data): event.timestamp.timestamp()}
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            self._queue_event(pipe, event)
+            await pipe.execute()
+
+    def _queue_event(self, pipe: redis.client.Pipeline, event: StreamEvent) -> None:
+        """Queue the writes that store an event on a pipeline"""
+        self._queue_event_data(pipe, _event_to_dict(event))
+
+    def _queue_event_data(
+        self, pipe: redis.client.Pipeline, event_data: Dict[str, Any]
+    ) -> None:
+        """Queue the stream appends for an event already in its dict shape"""
+        fields = {"d": orjson.dumps(event_data)}
+
+        # Append to the main stream and the per-type/per-streamer index streams,
+        # each capped server-side
+        pipe.xadd(self.events_key, fields, maxlen=1000, approximate=True)
+        pipe.xadd(
+            self._type_events_key(event_data["event_type"]),
+            fields,
+            maxlen=1000,
+            approximate=True,
+        )
+        pipe.xadd(
+            self._streamer_events_key(event_data["broadcaster_login"]),
+            fields,
+            maxlen=200,
+            approximate=True,
         )
-
-        # Keep only last 1000 events
-        await self.redis_client.zremrangebyrank(self.events_key, 0, -1001)
 
     async def get_recent_events(self, limit: int = 50) -> List[Dict[str, Any]]:
         if not self.redis_client:
             raise RuntimeError("Redis client not connected")
 
-        # Get most recent events (highest scores)
-        events = await self.redis_client.zrevrange(self.events_key, 0, limit - 1)
+        return await self._read_event_stream(self.events_key, limit)
+
+    async def get_events_by_type(
+        self, event_type: str, limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        if not self.redis_client:
+            raise RuntimeError("Redis client not connected")
+
+        return await self._read_event_stream(self._type_events_key(event_type), limit)
+
+    async def get_events_by_streamer(
+        self, username: str, limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        if not self.redis_client:
+            raise RuntimeError("Redis client not connected")
+
+        return await self._read_event_stream(self._streamer_events_key(username), limit)
+
+    def _type_events_key(self, event_type: str) -> str:
+        return f"{self.events_key}:type:{event_type}"
+
+    def _streamer_events_key(self, username: str) -> str:
+        return f"{self.events_key}:login:{username.lower()}"
 
-        return [json.loads(event) for event in events]
+    async def _read_event_stream(self, key: str, limit: int) -> List[Dict[str, Any]]:
+        """Read the newest entries of an event stream"""
+        entries = await self.redis_client.xrevrange(key, count=limit)
+        return [orjson.loads(fields["d"]) for _, fields in entries]
 
     async def store_streamer(self, streamer: Streamer) -> None:
         if not self.redis_client:
@@ -200,7 +327,7 @@ class RedisStorage(StorageInterface):
 
         streamer_data = streamer.model_dump()
         await self.redis_client.hset(
-            self.streamers_key, streamer.username, json.dumps(streamer_data)
+            self.streamers_key, streamer.username, orjson.dumps(streamer_data)
         )
 
     async def get_streamer(self, username: str) -> Optional[Streamer]:
@@ -209,7 +336,8 @@ class RedisStorage(StorageInterface):
 
         data = await self.redis_client.hget(self.streamers_key, username)
         if data:
-            return Streamer(**json.loads(data))
+            # Rows were validated when written, so skip re-validation on read
+            return Streamer.model_construct(**orjson.loads(data))
         return None
 
     async def get_all_streamers(self) -> List[Streamer]:
@@ -217,19 +345,44 @@ class RedisStorage(StorageInterface):
             raise RuntimeError("Redis client not connected")
 
         streamers_data = await self.redis_client.hgetall(self.streamers_key)
-        return [Streamer(**json.loads(data)) for data in streamers_data.values()]
+        return [
+            Streamer.model_construct(**orjson.loads(data))
+            for data in streamers_data.values()
+        ]
 
     async def remove_streamer(self, username: str) -> None:
         if not self.redis_client:
             raise RuntimeError("Redis client not connected")
 
-        await self.redis_client.hdel(self.streamers_key, username)
-        await self.redis_client.hdel(self.status_key, username)
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.hdel(self.streamers_key, username)
+            pipe.hdel(self.status_key, username)
+            pipe.srem(self.live_key, username)
+            await pipe.execute()
 
     async def store_stream_status(self, status: StreamStatus) -> None:
         if not self.redis_client:
             raise RuntimeError("Redis client not connected")
 
+        # Write the status and its live-set membership atomically
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            self._queue_status(pipe, status)
+            await pipe.execute()
+
+    async def store_event_and_status(
+        self, event: StreamEvent, status: StreamStatus
+    ) -> None:
+        if not self.redis_client:
+            raise RuntimeError("Redis client not connected")
+
+        # One MULTI/EXEC round trip instead of one per write
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            self._queue_event(pipe, event)
+            self._queue_status(pipe, status)
+            await pipe.execute()
+
+    def _queue_status(self, pipe: redis.client.Pipeline, status: StreamStatus) -> None:
+        """Queue the writes that store a stream status on a pipeline"""
         status_data = {
             "user_id": status.user_id,
             "username": status.username,
@@ -240,9 +393,11 @@ class RedisStorage(StorageInterface):
             "last_event_type": status.last_event_type,
         }
 
-        await self.redis_client.hset(
-            self.status_key, status.username, json.dumps(status_data)
-        )
+        pipe.hset(self.status_key, status.username, orjson.dumps(status_data))
+        if status.is_live:
+            pipe.sadd(self.live_key, status.username)
+        else:
+            pipe.srem(self.live_key, status.username)
 
     async def get_stream_status(self, username: str) -> Optional[StreamStatus]:
         if not self.redis_client:
@@ -250,28 +405,37 @@ class RedisStorage(StorageInterface):
 
         data = await self.redis_client.hget(self.status_key, username)
         if data:
-            status_data = json.loads(data)
+            status_data = orjson.loads(data)
             status_data["last_updated"] = datetime.fromisoformat(
                 status_data["last_updated"]
             )
-            return StreamStatus(**status_data)
+            return StreamStatus.model_construct(**status_data)
         return None
 
     async def get_live_streams(self) -> List[StreamStatus]:
         if not self.redis_client:
             raise RuntimeError("Redis client not connected")
 
-        all_status_data = await self.redis_client.hgetall(self.status_key)
+        # Only fetch and parse the statuses of streamers that are live
+        live_usernames = await self.redis_client.smembers(self.live_key)
+        if not live_usernames:
+            return []
+
+        live_status_data = await self.redis_client.hmget(
+            self.status_key, *live_usernames
+        )
         live_streams = []
 
-        for data in all_status_data.values():
-            status_data = json.loads(data)
+        for data in live_status_data:
+            if data is None:
+                continue
+            status_data = orjson.loads(data)
+            if not status_data.get("is_live"):
+                continue
             status_data["last_updated"] = datetime.fromisoformat(
                 status_data["last_updated"]
             )
-            status = StreamStatus(**status_data)
-            if status.is_live:
-                live_streams.append(status)
+            live_streams.append(StreamStatus.model_construct(**status_data))
 
         return live_streams
 
@@ -291,3 +455,8 @@ def get_storage() -> StorageInterface:
             _storage_instance = MemoryStorage()
 
     return _storage_instance
+
+
+def get_app_storage(request: Request) -> StorageInterface:
+    """Get the storage backend connected during app startup"""
+    return request.app.state.storage
@@ -12,6 +12,9 @@ from app.analytics import analytics_service
 
 logger = logging.getLogger(__name__)
 
+# EventSub subscription types this service subscribes to and dispatches
+HANDLED_EVENT_TYPES = frozenset({"stream.online", "stream.offline"})
+
 
 class StreamerManager:
     """Manages streamer configurations and EventSub subscriptions"""
@@ -24,17 +27,12 @@ class StreamerManager:
     async def initialize(self):
         """Initialize streamer manager"""
         # Load default streamers from config
-        if settings.DEFAULT_STREAMERS:
-            default_streamers = [
-                s.strip() for s in settings.DEFAULT_STREAMERS.split(",") if s.strip()
-            ]
-
-            for username in default_streamers:
-                try:
-                    await self.add_streamer(username)
-                    logger.info(f"Added default streamer: {username}")
-                except Exception as e:
-                    logger.error(f"Failed to add default streamer {username}: {e}")
+        for username in settings.DEFAULT_STREAMERS_LIST:
+            try:
+                await self.add_streamer(username)
+                logger.info(f"Added default streamer: {username}")
+            except Exception as e:
+                logger.error(f"Failed to add default streamer {username}: {e}")
 
         # Validate and fix EventSub subscriptions for all streamers
         await self.validate_and_fix_subscriptions()
@@ -53,6 +51,7 @@ class StreamerManager:
                 await self._update_task
             except asyncio.CancelledError:
                 pass
+        await self.twitch_api.aclose()
 
     async def add_streamer(self, username: str) -> Streamer:
         """Add a new streamer to monitor"""
@@ -147,29 +146,31 @@ class StreamerManager:
     async def _handle_stream_online(self, event_data: Dict[str, Any]) -> None:
         """Handle stream.online event"""
         try:
-            stream_event = StreamEvent(
+            # Fields come straight from the decoded webhook payload, so build
+            # the models without re-validating them through pydantic
+            now = datetime.now(timezone.utc)
+            stream_event = StreamEvent.model_construct(
                 id=str(uuid.uuid4()),
                 event_type="stream.online",
                 broadcaster_id=event_data["broadcaster_user_id"],
                 broadcaster_login=event_data["broadcaster_user_login"],
                 broadcaster_name=event_data["broadcaster_user_name"],
-                timestamp=datetime.now(timezone.utc),
+                timestamp=now,
                 data=event_data,
             )
 
-            await self.storage.store_event(stream_event)
-
             # Update stream status
-            status = StreamStatus(
+            status = StreamStatus.model_construct(
                 user_id=event_data["broadcaster_user_id"],
                 username=event_data["broadcaster_user_login"],
                 display_name=event_data["broadcaster_user_name"],
                 is_live=True,
                 stream_data=event_data,
-                last_updated=datetime.now(timezone.utc),
+                last_updated=now,
                 last_event_type="stream.online",
             )
-            await self.storage.store_stream_status(status)
+            # Store the event and the status it produced in one storage write
+            await self.storage.store_event_and_status(stream_event, status)
 
             # Start analytics session
             try:
@@ -191,29 +192,31 @@ class StreamerManager:
     async def _handle_stream_offline(self, event_data: Dict[str, Any]) -> None:
         """Handle stream.offline event"""
         try:
-            stream_event = StreamEvent(
+            # Fields come straight from the decoded webhook payload, so build
+            # the models without re-validating them through pydantic
+            now = datetime.now(timezone.utc)
+            stream_event = StreamEvent.model_construct(
                 id=str(uuid.uuid4()),
                 event_type="stream.offline",
                 broadcaster_id=event_data["broadcaster_user_id"],
                 broadcaster_login=event_data["broadcaster_user_login"],
                 broadcaster_name=event_data["broadcaster_user_name"],
-                timestamp=datetime.now(timezone.utc),
+                timestamp=now,
                 data=event_data,
             )
 
-            await self.storage.store_event(stream_event)
-
             # Update stream status
-            status = StreamStatus(
+            status = StreamStatus.model_construct(
                 user_id=event_data["broadcaster_user_id"],
                 username=event_data["broadcaster_user_login"],
                 display_name=event_data["broadcaster_user_name"],
                 is_live=False,
                 stream_data=None,
-                last_updated=datetime.now(timezone.utc),
+                last_updated=now,
                 last_event_type="stream.offline",
             )
-            await self.storage.store_stream_status(status)
+            # Store the event and the status it produced in one storage write
+            await self.storage.store_event_and_status(stream_event, status)
 
             # End analytics session
             try:
@@ -764,3 +767,17 @@ class StreamerManager:
             logger.debug(
                 f"Could not delete {sub_type} subscription for {username}: {e}"
             )
+
+
+# Streamer manager singleton shared by lifespan and every router
+_streamer_manager_instance: Optional[StreamerManager] = None
+
+
+def get_streamer_manager() -> StreamerManager:
+    """Get the shared streamer manager instance"""
+    global _streamer_manager_instance
+
+    if _streamer_manager_instance is None:
+        _streamer_manager_instance = StreamerManager()
+
+    return _streamer_manager_instance
@@ -1,4 +1,6 @@
+import asyncio
 import httpx
+from fastapi import Request
 import logging
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta, timezone
@@ -18,38 +20,64 @@ class TwitchAPI:
         self.auth_url = "https://id.twitch.tv/oauth2/token"
         self.access_token: Optional[str] = None
         self.token_expires_at: Optional[datetime] = None
-
-    async def _get_access_token(self) -> str:
-        """Get or refresh access token"""
-        if (
+        self._client: Optional[httpx.AsyncClient] = None
+        # Concurrent callers with an expired token share a single refresh
+        self._token_lock = asyncio.Lock()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the shared HTTP client, creating it on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient()
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _token_is_valid(self) -> bool:
+        """Check for a cached token that is not within 5 minutes of expiring"""
+        return bool(
             self.access_token
             and self.token_expires_at
             and datetime.now(timezone.utc)
             < self.token_expires_at - timedelta(minutes=5)
-        ):
+        )
+
+    async def _get_access_token(self) -> str:
+        """Get or refresh access token"""
+        if self._token_is_valid():
             return self.access_token
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                self.auth_url,
-                data={
-                    "client_id": self.client_id,
-                    "client_secret": self.client_secret,
-                    "grant_type": "client_credentials",
-                },
-            )
+        async with self._token_lock:
+            # Another caller may have refreshed it while this one waited
+            if self._token_is_valid():
+                return self.access_token
+            return await self._refresh_access_token()
+
+    async def _refresh_access_token(self) -> str:
+        """Request a new app access token from Twitch"""
+        response = await self._get_client().post(
+            self.auth_url,
+            data={
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+                "grant_type": "client_credentials",
+            },
+        )
 
-            if response.status_code != 200:
-                raise Exception(f"Failed to get access token: {response.text}")
+        if response.status_code != 200:
+            raise Exception(f"Failed to get access token: {response.text}")
 
-            data = response.json()
-            self.access_token = data["access_token"]
-            self.token_expires_at = datetime.now(timezone.utc) + timedelta(
-                seconds=data["expires_in"]
-            )
+        data = response.json()
+        self.access_token = data["access_token"]
+        self.token_expires_at = datetime.now(timezone.utc) + timedelta(
+            seconds=data["expires_in"]
+        )
 
-            logger.info("Obtained new Twitch access token")
-            return self.access_token
+        logger.info("Obtained new Twitch access token")
+        return self.access_token
 
     async def _make_request(
         self, method: str, endpoint: str, **kwargs
@@ -63,20 +91,19 @@ class TwitchAPI:
             "Content-Type": "application/json",
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.request(
-                method=method,
-                url=f"{self.base_url}/{endpoint}",
-                headers=headers,
-                **kwargs,
-            )
+        response = await self._get_client().request(
+            method=method,
+            url=f"{self.base_url}/{endpoint}",
+            headers=headers,
+            **kwargs,
+        )
 
-            if response.status_code not in [200, 201, 202, 204]:
-                raise Exception(
-                    f"Twitch API error: {response.status_code} - {response.text}"
-                )
+        if response.status_code not in [200, 201, 202, 204]:
+            raise Exception(
+                f"Twitch API error: {response.status_code} - {response.text}"
+            )
 
-            return response.json() if response.content else {}
+        return response.json() if response.content else {}
 
     async def get_user_by_login(self, login: str) -> Optional[Dict[str, Any]]:
         """Get user information by login name"""
@@ -133,22 +160,19 @@ class TwitchAPI:
                 "Content-Type": "application/json",
             }
 
-            async with httpx.AsyncClient() as client:
-                response = await client.delete(
-                    f"{self.base_url}/eventsub/subscriptions?id={subscription_id}",
-                    headers=headers,
-                )
+            response = await self._get_client().delete(
+                f"{self.base_url}/eventsub/subscriptions?id={subscription_id}",
+                headers=headers,
+            )
 
-                if response.status_code == 404:
-                    # Subscription doesn't exist, which means it's already deleted
-                    logger.debug(
-                        f"Subscription {subscription_id} already deleted (404)"
-                    )
-                    return
-                elif response.status_code not in [200, 201, 202, 204]:
-                    raise Exception(
-                        f"Twitch API error: {response.status_code} - {response.text}"
-                    )
+            if response.status_code == 404:
+                # Subscription doesn't exist, which means it's already deleted
+                logger.debug(f"Subscription {subscription_id} already deleted (404)")
+                return
+            elif response.status_code not in [200, 201, 202, 204]:
+                raise Exception(
+                    f"Twitch API error: {response.status_code} - {response.text}"
+                )
 
         except Exception as e:
             # Check if it's a 404 error embedded in the exception message
@@ -282,3 +306,8 @@ class TwitchAPI:
         except Exception as e:
             logger.error(f"Error during all subscriptions cleanup: {e}")
             return 0
+
+
+def get_twitch_api(request: Request) -> TwitchAPI:
+    """Get the shared Twitch API client created during app startup"""
+    return request.app.state.twitch_api
@@ -0,0 +1,97 @@
+import hashlib
+from typing import Any, AsyncIterator, Dict
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+# Rows serialized per chunk when streaming JSON arrays
+JSON_STREAM_BATCH_ROWS = 100
+
+
+def get_real_ip(request: Request) -> str:
+    """Extract the real client IP from request headers"""
+    # Middleware and handlers share request state, so resolve the IP only once
+    state = request.state
+    client_ip = getattr(state, "client_ip", None)
+    if client_ip is None:
+        client_ip = state.client_ip = _resolve_client_ip(request)
+    return client_ip
+
+
+def _resolve_client_ip(request: Request) -> str:
+    """Scan proxy headers for the original client address"""
+    # Single pass over the raw ASGI headers (names are already lowercased)
+    forwarded_for = None
+    real_ip = None
+    for name, value in request.scope["headers"]:
+        if not value:
+            continue
+        # Cloudflare header is the most specific, so it wins immediately
+        if name == b"cf-connecting-ip":
+            return value.decode("latin-1")
+        if name == b"x-forwarded-for":
+            if forwarded_for is None:
+                forwarded_for = value
+        elif name == b"x-real-ip":
+            if real_ip is None:
+                real_ip = value
+
+    # X-Forwarded-For can contain multiple IPs, take the first one (original client)
+    if forwarded_for is not None:
+        comma = forwarded_for.find(b",")
+        first_hop = forwarded_for if comma < 0 else forwarded_for[:comma]
+        return first_hop.strip().decode("latin-1")
+
+    # X-Real-IP header (Nginx)
+    if real_ip is not None:
+        return real_ip.decode("latin-1")
+
+    # Fall back to direct client IP
+    if request.client:
+        return request.client.host
+
+    return "unknown"
+
+
+async def json_array_response(
+    key: str, rows: AsyncIterator[Dict[str, Any]], **fields: Any
+) -> StreamingResponse:
+    """Stream {key: [rows...], "count": n, **fields} as rows arrive"""
+    # Pull the first row up front so query errors still surface as a normal 500
+    first = await anext(rows, None)
+
+    async def body() -> AsyncIterator[bytes]:
+        chunk = [b'{"' + key.encode() + b'":[']
+        count = 0
+        if first is not None:
+            chunk.append(orjson.dumps(first))
+            count = 1
+            async for row in rows:
+                chunk.append(b"," + orjson.dumps(row))
+                count += 1
+                # Flush in batches rather than one ASGI send per row
+                if len(chunk) >= JSON_STREAM_BATCH_ROWS:
+                    yield b"".join(chunk)
+                    chunk = []
+        # Totals are only known once the cursor is drained, so they go last
+        chunk.append(b"]," + orjson.dumps({"count": count, **fields})[1:])
+        yield b"".join(chunk)
+
+    return StreamingResponse(body(), media_type="application/json")
+
+
+def etag_json_response(request: Request, content: Any, max_age: int) -> Response:
+    """Render content as JSON with an ETag, answering 304 if the client is current"""
+    body = orjson.dumps(content)
+    etag = f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+    # private: browsers may reuse the response, shared caches and proxies may not
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={max_age}"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (
+        if_none_match.strip() == "*"
+        or etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    ):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)